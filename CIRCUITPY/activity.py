@@ -25,4 +25,16 @@ def dict_from_activity(c):
         DOWN: c.DOWN,
         LEFT: c.LEFT,
         SELECT: c.SELECT
-    }
\ No newline at end of file
+    }
+
+# Sprite frames used as icons by the given activities.
+# Text icons (strings) and unassigned buttons are skipped.
+def activity_sprite_frames(activities):
+    frames = set()
+
+    for a in activities:
+        for action in (a.L1, a.L2, a.R1, a.R2, a.UP, a.RIGHT, a.DOWN, a.LEFT, a.SELECT):
+            if action and isinstance(action.icon, int):
+                frames.add(action.icon)
+
+    return frames
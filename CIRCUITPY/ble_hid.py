@@ -0,0 +1,80 @@
+############################################################
+# BLE radio, HID service and advertising. This is brought up
+# first thing in run.py, before the display and touch screen,
+# so a bonded host can reconnect while the UI is still loading.
+# The HID devices are handed to Device once it's created.
+############################################################
+import adafruit_ble
+from adafruit_ble.advertising import Advertisement
+from adafruit_ble.advertising.standard import ProvideServicesAdvertisement
+from adafruit_ble.services.standard.hid import HIDService
+from adafruit_ble.services.standard.device_info import DeviceInfoService
+from adafruit_hid.keyboard import Keyboard
+from adafruit_hid.consumer_control import ConsumerControl
+from adafruit_hid.mouse import Mouse
+from version import FIRMWARE_VERSION
+
+# Advertise as "Keyboard" (0x03C1) icon when pairing
+# https://www.bluetooth.com/specifications/assigned-numbers/
+APPEARANCE_KEYBOARD = 961
+
+##############################
+# BLEHID class
+##############################
+# Owns the BLE radio and the HID devices sent to over it. Starts advertising
+# as soon as it's created, unless a host is already connected.
+class BLEHID:
+    def __init__(self, name, manufacturer="Aaron Pendley"):
+        # BLE Device info
+        self._device_info = DeviceInfoService(software_revision=FIRMWARE_VERSION, manufacturer=manufacturer)
+
+        # BLE HID service
+        self._hid_service = HIDService()
+
+        self._advertisement = ProvideServicesAdvertisement(self._hid_service)
+        self._advertisement.appearance = APPEARANCE_KEYBOARD
+
+        self._scan_response = Advertisement()
+        self._scan_response.complete_name = name
+
+        self._radio = adafruit_ble.BLERadio()
+        self._radio.name = name
+
+        if self._radio.connected:
+            print("Connected")
+        else:
+            print("Advertising...")
+            self.start_advertising()
+
+        # HID devices
+        self._keyboard = Keyboard(self._hid_service.devices)
+        self._consumer_control = ConsumerControl(self._hid_service.devices)
+        self._mouse = Mouse(self._hid_service.devices)
+
+    @property
+    def connected(self):
+        return self._radio.connected
+
+    @property
+    def advertising(self):
+        return self._radio.advertising
+
+    # The HID service's devices, for sending reports directly
+    @property
+    def devices(self):
+        return self._hid_service.devices
+
+    @property
+    def keyboard(self):
+        return self._keyboard
+
+    @property
+    def consumer_control(self):
+        return self._consumer_control
+
+    @property
+    def mouse(self):
+        return self._mouse
+
+    def start_advertising(self):
+        self._radio.start_advertising(self._advertisement, self._scan_response)
@@ -0,0 +1,55 @@
+from adafruit_ticks import ticks_ms, ticks_diff
+
+##############################
+# BootTimer class
+##############################
+# Times each phase of startup. Call phase(name) at the end of each phase;
+# it's timed from the end of the previous one (or from when the timer was made).
+class BootTimer:
+    def __init__(self):
+        self._start = ticks_ms()
+        self._phase_start = self._start
+        self._phases = []
+
+    # Milliseconds since the timer was made
+    @property
+    def elapsed(self):
+        return ticks_diff(ticks_ms(), self._start)
+
+    # (name, duration) for each phase so far
+    @property
+    def phases(self):
+        return self._phases
+
+    def phase(self, name):
+        now = ticks_ms()
+        self._phases.append((name, ticks_diff(now, self._phase_start)))
+        self._phase_start = now
+
+    # Print each phase over serial
+    def dump(self):
+        for name, duration in self._phases:
+            print(f"{name:>12}: {duration}ms")
+
+        print(f"{'total':>12}: {self.elapsed}ms")
+
+    # One line per boot, e.g. "version=1.1.0 total=7342 keyboard=120 display=810 ..."
+    def log_line(self, version):
+        fields = [f"version={version}", f"total={self.elapsed}"]
+
+        for name, duration in self._phases:
+            fields.append(f"{name}={duration}")
+
+        return " ".join(fields)
+
+    # Append this boot's timings to a log file, e.g. on the SD card
+    def save(self, path, version):
+        try:
+            with open(path, 'a') as f:
+                f.write(self.log_line(version))
+                f.write("\n")
+        except Exception as e:
+            print("Failed to save boot log:", e)
+
+# Shared by code.py and run.py. Startup is timed from the first import of this module.
+boot_timer = BootTimer()
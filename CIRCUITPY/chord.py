@@ -0,0 +1,79 @@
+from adafruit_ticks import ticks_ms, ticks_diff
+from bbq10keyboard import STATE_PRESS, STATE_RELEASE
+
+# How long every key of a chord has to be held together before it fires (ms).
+# Long enough that pressing the keys together in normal use (e.g. Ctrl + Alt + Enter) doesn't fire it.
+CHORD_HOLD_DURATION = 2000
+
+##############################
+# Chord class
+##############################
+# Calls 'callback' once every key in 'keys' has been held down at the same time
+# for CHORD_HOLD_DURATION. Fires once per hold. Feed it every key event with
+# update(), and call poll() while it's held, to fire it when the time is up.
+class Chord:
+    def __init__(self, keys, callback):
+        self._keys = keys
+        self._callback = callback
+        self._all_held = (1 << len(keys)) - 1
+        self._held = 0
+
+        # When every key was first held together, or None if they aren't
+        self._all_held_time = None
+        self._fired = False
+
+    # True while every key is held, until the chord fires
+    @property
+    def pending(self):
+        return self._all_held_time is not None and not self._fired
+
+    def update(self, key_state, key_code):
+        if key_code not in self._keys:
+            return
+
+        bit = 1 << self._keys.index(key_code)
+
+        if key_state == STATE_PRESS:
+            self._held |= bit
+
+            if self._held == self._all_held and self._all_held_time is None:
+                self._all_held_time = ticks_ms()
+                self._fired = False
+
+        elif key_state == STATE_RELEASE:
+            self._held &= ~bit
+            self._all_held_time = None
+
+    def poll(self):
+        if self.pending and ticks_diff(ticks_ms(), self._all_held_time) >= CHORD_HOLD_DURATION:
+            self._fired = True
+            self._callback()
+
+##############################
+# Chords class
+##############################
+# A set of chords. Key events still go to the current mode as usual; the chords only watch them.
+class Chords:
+    def __init__(self):
+        self._chords = []
+
+    def add(self, keys, callback):
+        self._chords.append(Chord(keys, callback))
+
+    # True while any chord is held and waiting to fire, so poll() needs calling even without key events
+    @property
+    def pending(self):
+        for chord in self._chords:
+            if chord.pending:
+                return True
+
+        return False
+
+    def update(self, key_events):
+        for chord in self._chords:
+            for key_state, key_code in key_events:
+                chord.update(key_state, key_code)
+
+    def poll(self):
+        for chord in self._chords:
+            chord.poll()
@@ -1,10 +1,8 @@
-from adafruit_ticks import ticks_ms, ticks_diff
-START = ticks_ms()
+from boot_timer import boot_timer
 
 from run import update
 
-END = ticks_ms()
-print("Launch time:", ticks_diff(END, START))
+print("Launch time:", boot_timer.elapsed)
 
 while True:
-    update()
\ No newline at end of file
+    update()
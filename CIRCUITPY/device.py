@@ -6,36 +6,46 @@ from user import colors
 import brightness
 import sprites
 from display_controller import DisplayController
-import adafruit_ble
-from adafruit_ble.advertising import Advertisement
-from adafruit_ble.advertising.standard import ProvideServicesAdvertisement
-from adafruit_ble.services.standard.hid import HIDService
-from adafruit_ble.services.standard.device_info import DeviceInfoService
-from adafruit_hid.keyboard import Keyboard
 from adafruit_hid.keyboard_layout_us import KeyboardLayoutUS
-from adafruit_hid.consumer_control import ConsumerControl
-from adafruit_hid.mouse import Mouse
+from hid_batch import BatchedKeyboard
+from profiler import Profiler
+from chord import Chords
+from latency import LatencyHistogram, ticks_us
 from adafruit_simplemath import constrain
+from bbq10keyboard import STATE_PRESS, STATE_RELEASE
 from user.config import CONFIG
 
 BATTERY_UPDATE_INTERVAL = 1000
 BLE_SCANNING_BLINK_INTERVAL = 500
 IDLE_BACKLIGHT_SHUTOFF_DURATION = 30 * 1000
+
+# idle_duration stops counting here (ms), well before ticks_diff() wraps around after about 3 days
+MAX_IDLE_DURATION = 24 * 60 * 60 * 1000
 LOW_VOLTAGE = constrain(CONFIG.low_voltage_warning, 3.2, 4.0)
 
+# Battery voltages are tracked in tenths of a volt, as ints, so that reading the battery doesn't allocate floats
+LOW_VOLTAGE_TENTHS = round(LOW_VOLTAGE * 10)
+
+# Returned by read_keys() when there are no key events, rather than a new empty list
+NO_KEY_EVENTS = ()
+
 class Device:
-    def __init__(self, display_controller, keyboard, touch_screen, neopixel, activity_index, brightness_index):
+    def __init__(self, display_controller, keyboard, touch_screen, neopixel, ble_hid, activity_index, brightness_index):
         self._display_controller = display_controller
         self._keyboard = keyboard
         self._touch_screen = touch_screen
         self._neopixel = neopixel
 
+        # Main loop stage timing. Reading touch samples allocates, so the touch screen tells the profiler when it does.
+        self._profiler = Profiler()
+        touch_screen.profiler = self._profiler
+
         # Brightness settings
         self._set_brightness(brightness_index)
 
         # Battery tracking
         self._vbat_pin = AnalogIn(board.VOLTAGE_MONITOR)
-        self._vbat_ref = self._vbat_pin.reference_voltage
+        self._vbat_ref_mv = round(self._vbat_pin.reference_voltage * 1000)
         self._last_battery = None
         self._last_battery_update_time = None
 
@@ -52,16 +62,20 @@ class Device:
         )
         self._battery_label.hidden = True
 
+        # The battery sprite has its own palette, recolored in place when the battery gets low
+        self._battery_palette = colors.make_palette(display_controller.foreground_color)
+
         self._battery_sprite = display_controller.add_sprite(
             to_group=display_controller.root_group, 
             sprite_frame=sprites.BATTERY_FULL, 
             x=0, 
             y=-2,
             h_align=DisplayController.ALIGN_TRAILING,
-            v_align=DisplayController.ALIGN_LEADING
+            v_align=DisplayController.ALIGN_LEADING,
+            palette=self._battery_palette
         )
         self._battery_sprite.group.hidden = True
-        self._update_battery()
+        self.update_battery()
 
         self._battery_sprite.group.hidden = False
         self._battery_label.hidden = False
@@ -69,38 +83,23 @@ class Device:
         # Current activity index
         self._activity_index = activity_index
 
-        # BLE Device info
-        self._device_info = DeviceInfoService(software_revision="1.1.0", manufacturer="Aaron Pendley")
+        # BLE radio and HID devices, already advertising (see ble_hid.py)
+        self._ble_hid = ble_hid
 
-        # BLE HID service
-        self._ble_hid = HIDService()
-
-        # Advertise as "Keyboard" (0x03C1) icon when pairing
-        # https://www.bluetooth.com/specifications/assigned-numbers/
-        self._advertisement = ProvideServicesAdvertisement(self._ble_hid)
-        self._advertisement.appearance = 961
-
-        self._scan_response = Advertisement()
-        self._scan_response.complete_name = CONFIG.ble_name
-
-        self._ble_radio = adafruit_ble.BLERadio()
-        self._ble_radio.name = CONFIG.ble_name
-
-        # Track connection state transtitions
-        self._is_connected = self._ble_radio.connected
+        # Track connection state transtitions. A host may have connected while we were starting up.
+        self._is_connected = ble_hid.connected
         self._was_connected = False
 
-        if self._is_connected:
-            print("Connected")
-        else:
-            print("Advertising...")
-            self._ble_radio.start_advertising(self._advertisement, self._scan_response)
+        # Key press to HID report latency, measured from when key events are read
+        # in read_keys() to when their report is handed to the HID device.
+        self._key_latency = LatencyHistogram("Key to HID report latency")
+        self._keys_read_time = None
 
-        # HID
-        self._hid_keyboard = Keyboard(self._ble_hid.devices)
-        self._hid_keyboard_layout = KeyboardLayoutUS(self._hid_keyboard)
-        self._hid_cc = ConsumerControl(self._ble_hid.devices)
-        self._hid_mouse = Mouse(self._ble_hid.devices)
+        # HID. Keyboard reports are batched until flush_hid() is called.
+        self._hid_keyboard = BatchedKeyboard(ble_hid.devices, on_send=self.record_key_latency)
+        self._hid_keyboard_layout = KeyboardLayoutUS(ble_hid.keyboard)
+        self._hid_cc = ble_hid.consumer_control
+        self._hid_mouse = ble_hid.mouse
 
         # BLE status display via NeoPixel
         self._neopixel.brightness = brightness.get_neopixel_brightness(self._brightness_index)
@@ -110,6 +109,16 @@ class Device:
         # Idle handler
         self._last_interaction = None
         self._is_idle = False
+        self._idle_duration_maxed = False
+
+        # Number of keys currently held down
+        self._keys_held = 0
+
+        # Hidden key chords, fired by holding their keys together
+        self._chords = Chords()
+
+        # Optional InputRecorder for key events and touch samples
+        self._input_recorder = None
 
     @property
     def display_controller(self):
@@ -184,6 +193,72 @@ class Device:
     def hid_mouse(self):
         return self._hid_mouse
 
+    @property
+    def profiler(self):
+        return self._profiler
+
+    @property
+    def key_latency(self):
+        return self._key_latency
+
+    @property
+    def input_recorder(self):
+        return self._input_recorder
+
+    # Record key events, and the touch screen's samples, to an InputRecorder (or None to stop)
+    @input_recorder.setter
+    def input_recorder(self, recorder):
+        self._input_recorder = recorder
+        self._touch_screen.recorder = recorder
+
+    # Record latency for key events from the last read_keys() whose HID report was just sent
+    def record_key_latency(self, event_count):
+        if not self._key_latency.enabled or self._keys_read_time is None:
+            return
+
+        latency = ticks_us() - self._keys_read_time
+
+        for _ in range(event_count):
+            self._key_latency.record(latency)
+
+    # Call 'callback' when all of 'keys' are held at once
+    def add_chord(self, keys, callback):
+        self._chords.add(keys, callback)
+
+    # Send any keyboard reports batched up since the last flush
+    def flush_hid(self):
+        self._hid_keyboard.flush()
+
+    # Number of keys currently held down, as of the last read_keys(). Counted from
+    # press and release events, since the keyboard can't report which keys are down.
+    @property
+    def keys_held(self):
+        return self._keys_held
+
+    # Start counting held keys from zero again. A release lost to a full key FIFO would
+    # otherwise leave keys_held above zero for good, so this is done on mode changes and
+    # when the device goes idle. A key that really is still held then just isn't counted.
+    def forget_held_keys(self):
+        self._keys_held = 0
+
+    # Milliseconds since the last interaction, up to MAX_IDLE_DURATION
+    @property
+    def idle_duration(self):
+        if self._last_interaction is None:
+            return 0
+
+        if self._idle_duration_maxed:
+            return MAX_IDLE_DURATION
+
+        idle_duration = ticks_diff(ticks_ms(), self._last_interaction)
+
+        # Negative once the tick counter has wrapped around since the last interaction
+        if idle_duration >= MAX_IDLE_DURATION or idle_duration < 0:
+            self._idle_duration_maxed = True
+            return MAX_IDLE_DURATION
+
+        return idle_duration
+
     def did_interact(self):
         if self._is_idle:
             self._keyboard.keyboard_backlight = self.keyboard_brightness
@@ -191,49 +266,89 @@ class Device:
             self._neopixel.brightness = brightness.get_neopixel_brightness(self._brightness_index)
 
         self._is_idle = False
+        self._idle_duration_maxed = False
         self._last_interaction = ticks_ms()
 
     def invalidate_battery(self):
         self._last_battery_update_time = None
         self._last_battery = None
 
+    # Returns the list of (key state, key code) events since the last call.
+    # Doesn't allocate when there are none.
     def read_keys(self):
-        key_count = self._keyboard.key_count
+        if self._keyboard.key_count == 0:
+            # A chord held long enough fires even though no keys changed
+            if self._chords.pending:
+                self._chords.poll()
+
+            return NO_KEY_EVENTS
 
-        if key_count > 0:
-            key_events = self._keyboard.keys
+        # The keyboard driver builds a new list of events
+        self._profiler.expect_allocations()
+
+        key_events = self._keyboard.keys
+
+        # Taken before the chords are updated, so chord handling counts towards the latency.
+        # None when measuring is off, so a chord that turns it on doesn't record a bogus sample.
+        if self._key_latency.enabled:
+            self._keys_read_time = ticks_us()
         else:
-            key_events = []
+            self._keys_read_time = None
+
+        if self._input_recorder is not None:
+            self._input_recorder.record_keys(key_events)
 
-        return (key_count, key_events)      
+        for key_state, _ in key_events:
+            if key_state == STATE_PRESS:
+                self._keys_held += 1
+            elif key_state == STATE_RELEASE and self._keys_held > 0:
+                self._keys_held -= 1
 
+        self._chords.update(key_events)
+        self._chords.poll()
+
+        return key_events
+
+    # Update everything at once. When run from the scheduler, each of these
+    # is registered as its own task with its own period instead.
     def update(self):
+        self.update_connection()
+        self.update_battery()
+        self.update_ble_neopixel()
+        self.update_idle_controller()
+
+    # Track BLE connection state transitions
+    def update_connection(self):
         self._was_connected = self._is_connected
-        self._is_connected = self._ble_radio.connected
+        self._is_connected = self._ble_hid.connected
+
+        if self._is_connected != self._was_connected:
+            self._profiler.expect_allocations()
 
         if self.was_connected and not self.is_connected:
             print("Disconnected")
-            self._ble_radio.start_advertising(self._advertisement, self._scan_response)
             self.did_interact()
         elif self.is_connected and not self.was_connected:
             print("Connected")
             self.did_interact()
 
-        self._update_battery()
-        self._update_ble_neopixel()
-        self._update_idle_controller()
+        # Advertise whenever nothing is connected. Checked every time rather than only on a
+        # disconnect, since a host may have connected and dropped while we were starting up.
+        if not self._is_connected and not self._ble_hid.advertising:
+            self._ble_hid.start_advertising()
 
+    # Battery voltage in tenths of a volt. The battery is measured through a 1/2 voltage divider.
     def _get_voltage(self):
-        v = (self._vbat_pin.value * self._vbat_ref) / 65536 * 2
-        return round(v, 1)        
+        millivolts = (self._vbat_pin.value * self._vbat_ref_mv * 2) >> 16
+        return (millivolts + 50) // 100
 
     def _get_voltage_text(self, voltage):
-        if voltage <= LOW_VOLTAGE:
-            return f"{voltage:.1f}V!"
+        if voltage <= LOW_VOLTAGE_TENTHS:
+            return f"{voltage // 10}.{voltage % 10}V!"
         else:
-            return f"{voltage:.1f}V"
+            return f"{voltage // 10}.{voltage % 10}V"
 
-    def _update_battery(self):
+    def update_battery(self):
         now = ticks_ms()
 
         if self._last_battery_update_time is None or ticks_diff(now, self._last_battery_update_time) >= BATTERY_UPDATE_INTERVAL:
@@ -241,18 +356,19 @@ class Device:
             battery_voltage = self._get_voltage()
  
             if battery_voltage != self._last_battery:
+                self._profiler.expect_allocations()
                 self._last_battery = battery_voltage
                 self._battery_label.text = self._get_voltage_text(battery_voltage)
 
-                if battery_voltage <= LOW_VOLTAGE:
+                if battery_voltage <= LOW_VOLTAGE_TENTHS:
                     battery_color = colors.RED
-                    self._battery_sprite.tilegrid[0] = sprites.BATTERY_LOW
+                    self._display_controller.sprite_sheet.set_frame(self._battery_sprite, sprites.BATTERY_LOW)
                 else:
                     battery_color = self._display_controller.foreground_color
-                    self._battery_sprite.tilegrid[0] = sprites.BATTERY_FULL
+                    self._display_controller.sprite_sheet.set_frame(self._battery_sprite, sprites.BATTERY_FULL)
 
                 self._battery_label.color = battery_color
-                self._battery_sprite.tilegrid.pixel_shader = colors.make_palette(battery_color)
+                self._battery_palette[1] = battery_color
 
                 # Reposition battery sprite based on label's new width
                 label_x = self._battery_label.anchored_position[0]
@@ -261,7 +377,9 @@ class Device:
                 battery_sprite_x = label_x - label_width - sprite_width - 6
                 self._battery_sprite.group.x = battery_sprite_x
 
-    def _update_idle_controller(self):
+                self._display_controller.invalidate()
+
+    def update_idle_controller(self):
         # Kick off the interaction idle timer if there hasn't been an interaction yet
         if self._last_interaction is None:
             self.did_interact()
@@ -270,11 +388,12 @@ class Device:
 
         if not self._is_idle and (ticks_diff(now, self._last_interaction) >= IDLE_BACKLIGHT_SHUTOFF_DURATION):
             self._is_idle = True
+            self.forget_held_keys()
             self._keyboard.keyboard_backlight = 0.0
             self._keyboard.display_backlight = 0.0
             self._neopixel.brightness = brightness.get_neopixel_brightness(0)
 
-    def _update_ble_neopixel(self):
+    def update_ble_neopixel(self):
         if self.is_connected:
             self.neopixel.fill(CONFIG.neopixel_color)
         else:
@@ -1,6 +1,7 @@
 import displayio
 import terminalio
 from collections import namedtuple
+from adafruit_ticks import ticks_ms, ticks_diff
 from adafruit_display_text.label import Label
 from sprite_sheet import SpriteSheet, SpriteInstance
 from user import colors
@@ -21,14 +22,30 @@ Layout = namedtuple("Layout", [
 Icon = namedtuple("Icon", ['view', 'width', 'height'])
 Insets = namedtuple("Insets", ['top', 'bottom', 'left', 'right'])
 
+# Minimum time between display refreshes (ms)
+REFRESH_INTERVAL = 33
+
+# Longest a refresh is put off while update() is asked to defer, e.g. during a touch drag (ms)
+MAX_REFRESH_DEFERRAL = 250
+
 class DisplayController:
     ALIGN_LEADING = 0
     ALIGN_CENTER = 1
     ALIGN_TRAILING = 2
 
-    def __init__(self, display):
+    # The display's auto_refresh is turned off. Instead, anything that changes the UI calls
+    # invalidate(), and update() refreshes the display, at most once per REFRESH_INTERVAL,
+    # so all of a frame's changes go out over SPI together, between input frames.
+    # sprites_in_memory and sprite_frames are passed on to the SpriteSheet.
+    def __init__(self, display, sprites_in_memory=False, sprite_frames=None):
         self._display = display
 
+        display.auto_refresh = False
+        self._needs_refresh = False
+        self._invalidated_time = 0
+        self._last_refresh_time = ticks_ms()
+        self._refresh_count = 0
+
         self._layout = Layout(
             width=display.width,
             height=display.height,
@@ -42,8 +59,16 @@ class DisplayController:
             TOUCH_SCREEN_LABEL_Y=54
         )
 
+        # The UI palette. It's shared by every sprite drawn in the UI color, and recolored
+        # in place when the color changes, so those sprites change color with it.
+        self._palette = colors.make_palette(colors.ALL[0])
         self.color_index = 0
-        self._sprite_sheet = SpriteSheet("icons-tilemap-32.bmp", palette=self.palette)
+        self._sprite_sheet = SpriteSheet(
+            "icons-tilemap-32.bmp",
+            palette=self.palette,
+            in_memory=sprites_in_memory,
+            frames=sprite_frames
+        )
 
         self._root_group = displayio.Group()
         display.root_group = self._root_group
@@ -71,7 +96,8 @@ class DisplayController:
     @color_index.setter
     def color_index(self, index):
         self._color_index = index
-        self._palette = colors.make_palette(colors.ALL[index])
+        self._palette[1] = colors.ALL[index]
+        self.invalidate()
 
     @property
     def palette(self):
@@ -90,6 +116,44 @@ class DisplayController:
     def foreground_color(self):
         return self._palette[1]
 
+    # Number of times the display has been refreshed
+    @property
+    def refresh_count(self):
+        return self._refresh_count
+
+    @property
+    def needs_refresh(self):
+        return self._needs_refresh
+
+    # Call after changing anything on screen, so the next update() refreshes the display
+    def invalidate(self):
+        if not self._needs_refresh:
+            self._needs_refresh = True
+            self._invalidated_time = ticks_ms()
+
+    # Refresh the display now
+    def refresh(self):
+        self._display.refresh()
+        self._needs_refresh = False
+        self._last_refresh_time = ticks_ms()
+        self._refresh_count += 1
+
+    # Refresh the display if anything has changed, and it hasn't been refreshed too recently.
+    # With 'defer', the refresh is put off for up to MAX_REFRESH_DEFERRAL.
+    def update(self, defer=False):
+        if not self._needs_refresh:
+            return
+
+        now = ticks_ms()
+
+        if ticks_diff(now, self._last_refresh_time) < REFRESH_INTERVAL:
+            return
+
+        if defer and ticks_diff(now, self._invalidated_time) < MAX_REFRESH_DEFERRAL:
+            return
+
+        self.refresh()
+
     # Add an aligned label
     def add_label(
         self, 
@@ -1,36 +1,62 @@
 ############################################################
 # Adapted from https://dlbeer.co.nz/articles/tsf.html
 ############################################################
-def cmp_swap(arr, i, j):
-    if arr[i] > arr[j]:
-        arr[i], arr[j] = arr[j], arr[i]
 
-# Simple median filter
+# Number of samples in the median filter window
+MEDIAN_WINDOW = 5
+
+# Median of 5 samples using an optimal sorting network. The samples are sorted
+# in local variables, so finding the median doesn't allocate anything.
+# https://en.wikipedia.org/wiki/Sorting_network#Optimal_sorting_networks
+def median_5(a, b, c, d, e):
+    if a > b:
+        a, b = b, a
+    if c > d:
+        c, d = d, c
+    if a > c:
+        a, c = c, a
+    if b > e:
+        b, e = e, b
+    if a > b:
+        a, b = b, a
+    if c > d:
+        c, d = d, c
+    if b > c:
+        b, c = c, b
+    if d > e:
+        d, e = e, d
+    if c > d:
+        c, d = d, c
+
+    return c
+
+# Channel filters are called with (x, reset, dt): the sample, True for the first
+# sample of a new touch, and the time since the previous sample in microseconds
+# (0 if it isn't known). Only time based filters use dt.
+
+# Simple median filter. Samples are stored in a fixed-size ring buffer.
 class MedianFilter:
     def __init__(self):
-        self._samples = [0] * 5
+        self._samples = [0] * MEDIAN_WINDOW
+        self._index = 0
+
+    def __call__(self, x, reset, dt=0):
+        samples = self._samples
 
-    def __call__(self, x, reset):
         if reset:
-            self._samples = [x] * 5
+            for i in range(MEDIAN_WINDOW):
+                samples[i] = x
+
+            self._index = 0
             return x
-        else:
-            self._samples.pop(0)
-            self._samples.append(x)
-
-            # https://en.wikipedia.org/wiki/Sorting_network#Optimal_sorting_networks
-            sorted_samples = self._samples[:]
-            cmp_swap(sorted_samples, 0, 1)
-            cmp_swap(sorted_samples, 2, 3)
-            cmp_swap(sorted_samples, 0, 2)
-            cmp_swap(sorted_samples, 1, 4)
-            cmp_swap(sorted_samples, 0, 1)
-            cmp_swap(sorted_samples, 2, 3)
-            cmp_swap(sorted_samples, 1, 2)
-            cmp_swap(sorted_samples, 3, 4)
-            cmp_swap(sorted_samples, 2, 3)
-
-        return sorted_samples[2]
+
+        samples[self._index] = x
+        self._index += 1
+
+        if self._index == MEDIAN_WINDOW:
+            self._index = 0
+
+        return median_5(samples[0], samples[1], samples[2], samples[3], samples[4])
 
 # Infinite impulse response filter
 # https://en.wikipedia.org/wiki/Infinite_impulse_response
@@ -40,7 +66,7 @@ class IIRFilter:
         self._D = D
         self._s = 0
 
-    def __call__(self, x, reset=False):
+    def __call__(self, x, reset=False, dt=0):
         if reset:
             self._s = x
             return x
@@ -54,17 +80,117 @@ class ChannelFilter:
         self._median_filter = MedianFilter()
         self._iir_filter = IIRFilter(N, D)
 
-    def __call__(self, x, reset=False):
+    def __call__(self, x, reset=False, dt=0):
         median_value = self._median_filter(x, reset)
         return self._iir_filter(median_value, reset)
 
-# Filters a 2D point. Useful for touchscreen and other 2D point/vector filtering.
-class XYSampleFilter:
+# Integer-only channel filter. Same result as ChannelFilter for integer samples,
+# but with the median and IIR stages inlined to save the extra calls.
+# Small ints don't allocate, so filtering a sample allocates nothing.
+class IntChannelFilter:
     def __init__(self, N, D):
-        self._x_filter = ChannelFilter(N, D)
-        self._y_filter = ChannelFilter(N, D)
+        self._N = N
+        self._M = D - N
+        self._D = D
+        self._half_D = D // 2
+        self._s = 0
+        self._samples = [0] * MEDIAN_WINDOW
+        self._index = 0
+
+    def __call__(self, x, reset=False, dt=0):
+        samples = self._samples
+
+        if reset:
+            for i in range(MEDIAN_WINDOW):
+                samples[i] = x
+
+            self._index = 0
+            self._s = x
+            return x
 
-    def __call__(self, x, y, reset=False):
-        filtered_x = self._x_filter(x, reset)
-        filtered_y = self._y_filter(y, reset)
-        return (filtered_x, filtered_y)
+        samples[self._index] = x
+        self._index += 1
+
+        if self._index == MEDIAN_WINDOW:
+            self._index = 0
+
+        median_value = median_5(samples[0], samples[1], samples[2], samples[3], samples[4])
+        self._s = (self._N * self._s + self._M * median_value + self._half_D) // self._D
+        return self._s
+
+# Runs a sample through a sequence of channel filter stages, in order.
+# Any callable taking (x, reset, dt) can be a stage, e.g.
+# FilterChain(MedianFilter(), OneEuroFilter(rate=200))
+class FilterChain:
+    def __init__(self, *stages):
+        self._stages = stages
+
+    def __call__(self, x, reset=False, dt=0):
+        for stage in self._stages:
+            x = stage(x, reset, dt)
+
+        return x
+
+# One Euro filter: an adaptive low-pass filter whose cutoff frequency rises with speed.
+# Slow, precise movements are heavily smoothed, while fast movements get little lag.
+# The speed and cutoffs come from the time between samples, dt. Samples passed
+# without one (dt of 0) are assumed to arrive at 'rate' samples per second.
+# Returns whole values, so it composes with the integer-only stages.
+# https://gery.casiez.net/1euro/
+TWO_PI = 6.283185307179586
+
+class OneEuroFilter:
+    def __init__(self, rate, min_cutoff=1.0, beta=0.01, d_cutoff=1.0):
+        self._rate = rate
+        self._min_cutoff = min_cutoff
+        self._beta = beta
+        self._d_cutoff = d_cutoff
+        self._x = 0.0
+        self._dx = 0.0
+
+    def _alpha(self, cutoff, rate):
+        return 1.0 / (1.0 + rate / (TWO_PI * cutoff))
+
+    def __call__(self, x, reset=False, dt=0):
+        if reset:
+            self._x = x
+            self._dx = 0.0
+            return round(x)
+
+        rate = 1_000_000 / dt if dt > 0 else self._rate
+
+        # Smoothed speed, in units per second
+        dx = (x - self._x) * rate
+        self._dx += self._alpha(self._d_cutoff, rate) * (dx - self._dx)
+
+        # The faster it moves, the higher the cutoff and the less smoothing
+        cutoff = self._min_cutoff + self._beta * abs(self._dx)
+        self._x += self._alpha(cutoff, rate) * (x - self._x)
+        return round(self._x)
+
+# Filters a 2D point, using a channel filter per axis, made by make_channel_filter().
+# Useful for touchscreen and other 2D point/vector filtering.
+# update() leaves the filtered point in x and y without allocating a tuple,
+# calling the filter returns it as a tuple.
+class XYFilter:
+    def __init__(self, make_channel_filter):
+        self._x_filter = make_channel_filter()
+        self._y_filter = make_channel_filter()
+        self.x = 0
+        self.y = 0
+
+    def update(self, x, y, reset=False, dt=0):
+        self.x = self._x_filter(x, reset, dt)
+        self.y = self._y_filter(y, reset, dt)
+
+    def __call__(self, x, y, reset=False, dt=0):
+        self.update(x, y, reset, dt)
+        return (self.x, self.y)
+
+# Median and IIR filtered 2D point
+class XYSampleFilter(XYFilter):
+    def __init__(self, N, D, integer=False):
+        if integer:
+            super().__init__(lambda: IntChannelFilter(N, D))
+        else:
+            super().__init__(lambda: ChannelFilter(N, D))
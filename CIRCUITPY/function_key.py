@@ -25,3 +25,6 @@ HID_CONSUMER_CONTROL = 2
 
 # Mouse button event. Ex: Mouse.LEFT_BUTTON
 HID_MOUSE = 3
+
+# All function keys, in the order they are declared in an Activity
+ALL = (L1, L2, R1, R2, UP, RIGHT, DOWN, LEFT, SELECT)
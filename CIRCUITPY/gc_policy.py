@@ -0,0 +1,66 @@
+import gc
+from adafruit_ticks import ticks_ms, ticks_diff
+
+# Collect in an idle frame once this many bytes have been allocated since the last collection
+IDLE_COLLECT_BYTES = 4 * 1024
+
+# Frames only count as idle this long after the last interaction (ms)
+IDLE_COLLECT_DELAY = 250
+
+##############################
+# GCPolicy class
+##############################
+# Moves garbage collection pauses to moments the user can't perceive.
+# MicroPython can't collect incrementally, so instead of letting the heap fill up
+# and collecting in the middle of a touch drag, this collects little and often:
+# whenever a small amount has been allocated and nothing is being touched or held.
+# No gc.threshold() is set, so the VM only collects by itself when the heap is actually full.
+class GCPolicy:
+    def __init__(self, device, collect_bytes=IDLE_COLLECT_BYTES, idle_delay=IDLE_COLLECT_DELAY):
+        self._device = device
+        self._collect_bytes = collect_bytes
+        self._idle_delay = idle_delay
+        self._collect_count = 0
+        self._last_collect_time = None
+
+        gc.collect()
+        self._alloc_after_collect = gc.mem_alloc()
+
+    # Number of collections this policy has made
+    @property
+    def collect_count(self):
+        return self._collect_count
+
+    # Milliseconds since this policy last collected, or None if it hasn't
+    @property
+    def time_since_collect(self):
+        if self._last_collect_time is None:
+            return None
+
+        return ticks_diff(ticks_ms(), self._last_collect_time)
+
+    # Call regularly; collects if this is a good moment for it
+    def update(self):
+        device = self._device
+
+        # Never while the user is mid-gesture or holding a key
+        if device.touch_screen.in_contact or device.keys_held > 0:
+            return
+
+        if device.idle_duration < self._idle_delay:
+            return
+
+        allocated = gc.mem_alloc()
+
+        # The VM collected by itself since our last collection
+        if allocated < self._alloc_after_collect:
+            self._alloc_after_collect = allocated
+
+        if allocated - self._alloc_after_collect >= self._collect_bytes:
+            self.collect()
+
+    def collect(self):
+        gc.collect()
+        self._alloc_after_collect = gc.mem_alloc()
+        self._last_collect_time = ticks_ms()
+        self._collect_count += 1
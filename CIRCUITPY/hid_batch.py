@@ -0,0 +1,125 @@
+############################################################
+# Batch the keyboard HID reports generated by all of the key
+# events read in one frame, so that each frame sends the
+# fewest reports (BLE notifications) possible.
+#
+# Consumer control reports aren't batched: a report holds a
+# single code, so there are never two changes to combine.
+############################################################
+from adafruit_hid import find_device
+from adafruit_hid.keycode import Keycode
+
+# Keys (other than modifiers) that a boot keyboard report can hold at once
+REPORT_KEY_COUNT = 6
+
+##############################
+# BatchedKeyboard class
+##############################
+# Sends keyboard reports to the keyboard HID device in 'devices' (the same one an
+# adafruit_hid Keyboard would use), building the 8 byte report itself. press() and
+# release() only update the report, and flush() sends it. If an event would undo a
+# change that hasn't been sent yet (e.g. a key pressed and released in the same
+# frame), the pending report is sent first, so the host still sees every key in the
+# order it happened.
+# If given, on_send is called with the number of key events in each report sent.
+class BatchedKeyboard:
+    # Number of distinct keycodes that can change in one report before it's sent
+    MAX_PENDING_KEYCODES = 16
+
+    def __init__(self, devices, on_send=None):
+        self._keyboard_device = find_device(devices, usage_page=0x1, usage=0x06)
+        self._on_send = on_send
+        self._pending_events = 0
+
+        # Modifier bits, a reserved byte, then the keys held
+        self._report = bytearray(8)
+
+        # Flag per keycode, set if the keycode changed since the last report was sent
+        self._changed = bytearray(256)
+        self._changed_keycodes = bytearray(self.MAX_PENDING_KEYCODES)
+        self._changed_count = 0
+
+    def press(self, *keycodes):
+        self._begin_change(keycodes)
+
+        for keycode in keycodes:
+            self._add_keycode(keycode)
+
+        self._pending_events += 1
+
+    def release(self, *keycodes):
+        self._begin_change(keycodes)
+
+        for keycode in keycodes:
+            self._remove_keycode(keycode)
+
+        self._pending_events += 1
+
+    def flush(self):
+        if self._changed_count == 0:
+            return
+
+        self._keyboard_device.send_report(self._report)
+
+        changed = self._changed
+        changed_keycodes = self._changed_keycodes
+
+        for i in range(self._changed_count):
+            changed[changed_keycodes[i]] = 0
+
+        self._changed_count = 0
+
+        if self._on_send:
+            self._on_send(self._pending_events)
+
+        self._pending_events = 0
+
+    def _begin_change(self, keycodes):
+        changed = self._changed
+
+        # Send the pending report first if any of these keycodes already changed in it,
+        # or if there isn't room left to track them.
+        if self._changed_count + len(keycodes) > self.MAX_PENDING_KEYCODES:
+            self.flush()
+        else:
+            for keycode in keycodes:
+                if changed[keycode]:
+                    self.flush()
+                    break
+
+        for keycode in keycodes:
+            if not changed[keycode]:
+                changed[keycode] = 1
+                self._changed_keycodes[self._changed_count] = keycode
+                self._changed_count += 1
+
+    def _add_keycode(self, keycode):
+        report = self._report
+        modifier = Keycode.modifier_bit(keycode)
+
+        if modifier:
+            report[0] |= modifier
+            return
+
+        for i in range(2, 2 + REPORT_KEY_COUNT):
+            if report[i] == keycode:
+                return
+
+        for i in range(2, 2 + REPORT_KEY_COUNT):
+            if report[i] == 0:
+                report[i] = keycode
+                return
+
+        raise ValueError("Trying to press more than six keys at once.")
+
+    def _remove_keycode(self, keycode):
+        report = self._report
+        modifier = Keycode.modifier_bit(keycode)
+
+        if modifier:
+            report[0] &= ~modifier
+            return
+
+        for i in range(2, 2 + REPORT_KEY_COUNT):
+            if report[i] == keycode:
+                report[i] = 0
@@ -0,0 +1,142 @@
+import struct
+from adafruit_ticks import ticks_ms, ticks_diff
+
+############################################################
+# Trace file format
+#
+# A header, then fixed-size little-endian records:
+#   uint32 time (ms since recording started)
+#   uint8  record type
+#   uint8  a
+#   int16  x
+#   int16  y
+############################################################
+TRACE_MAGIC = b"FWTR"
+TRACE_VERSION = 1
+
+RECORD_FORMAT = "<IBBhh"
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+# Magic, version, record size, two reserved bytes
+HEADER_FORMAT = "<4sBBxx"
+
+# Key event. a = key state, x = key code (ord of the key's character)
+RECORD_KEY = 0
+
+# Raw touch controller sample. x, y = raw readings
+RECORD_TOUCH_RAW = 1
+
+# Filtered touch position. x, y = display coordinates
+RECORD_TOUCH_FILTERED = 2
+
+# Touch released
+RECORD_TOUCH_UP = 3
+
+# Records buffered in RAM between writes to the SD card
+BUFFER_RECORDS = 512
+
+##############################
+# InputRecorder class
+##############################
+# Records key events and touch samples with timestamps into a RAM buffer,
+# and writes the buffer to a file in large chunks. Nothing is allocated
+# per record, and writes only happen from update() once the buffer is
+# half full, unless a burst of input fills it completely first.
+class InputRecorder:
+    def __init__(self, buffer_records=BUFFER_RECORDS):
+        self._buffer = bytearray(buffer_records * RECORD_SIZE)
+        self._capacity = buffer_records
+        self._count = 0
+        self._file = None
+        self._path = None
+        self._start_time = 0
+        self._record_total = 0
+
+    @property
+    def recording(self):
+        return self._file is not None
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def record_total(self):
+        return self._record_total
+
+    # Start recording into a new file at 'path'. Returns True if the file could be created.
+    def start(self, path):
+        if self._file is not None:
+            self.stop()
+
+        try:
+            self._file = open(path, 'wb')
+            self._file.write(struct.pack(HEADER_FORMAT, TRACE_MAGIC, TRACE_VERSION, RECORD_SIZE))
+        except Exception as e:
+            print("Failed to start input recording:", e)
+            self._file = None
+            return False
+
+        self._path = path
+        self._count = 0
+        self._record_total = 0
+        self._start_time = ticks_ms()
+        print("Recording input to", path)
+        return True
+
+    def stop(self):
+        if self._file is None:
+            return
+
+        self.flush()
+
+        try:
+            self._file.close()
+        except Exception as e:
+            print("Failed to close input recording:", e)
+
+        self._file = None
+        print(f"Recorded {self._record_total} input records to {self._path}")
+
+    def record(self, record_type, a, x, y):
+        if self._file is None:
+            return
+
+        if self._count == self._capacity:
+            self.flush()
+
+        struct.pack_into(
+            RECORD_FORMAT,
+            self._buffer,
+            self._count * RECORD_SIZE,
+            ticks_diff(ticks_ms(), self._start_time),
+            record_type,
+            a,
+            x,
+            y
+        )
+
+        self._count += 1
+        self._record_total += 1
+
+    def record_keys(self, key_events):
+        for key_state, key_code in key_events:
+            self.record(RECORD_KEY, key_state, ord(key_code), 0)
+
+    # Call regularly, away from the input path; writes the buffer once it's half full
+    def update(self):
+        if self._count * 2 >= self._capacity:
+            self.flush()
+
+    def flush(self):
+        if self._file is None or self._count == 0:
+            return
+
+        try:
+            self._file.write(memoryview(self._buffer)[:self._count * RECORD_SIZE])
+            self._file.flush()
+        except Exception as e:
+            print("Failed to write input recording:", e)
+            self._file = None
+
+        self._count = 0
@@ -0,0 +1,147 @@
+import function_key
+from activity import dict_from_activity
+from bbq10keyboard import STATE_PRESS, STATE_RELEASE
+
+# The highest character code the keyboard can emit
+MAX_CHAR_CODE = 0x7F
+
+# Keycodes for every character the keyboard can emit, built on first use and shared by all dispatchers.
+_layout_keycodes = None
+
+def _no_op():
+    pass
+
+# Map each character the keyboard can emit to an immutable tuple of keycodes.
+# Characters the layout can't type are left out, so looking them up is just a miss.
+def _build_layout_keycodes(layout):
+    table = {}
+
+    for i in range(MAX_CHAR_CODE + 1):
+        char = chr(i)
+
+        try:
+            table[char] = tuple(layout.keycodes(char))
+        except ValueError:
+            pass
+
+    return table
+
+##############################
+# KeyDispatcher class
+##############################
+# Compiles an activity into a flat table mapping each function key code
+# straight to prebound press and release handlers, so translating a key event
+# into a HID event is a single dictionary lookup and call.
+# Keys that aren't in the table are standard keys from the keyboard, and are
+# sent through the keyboard layout.
+class KeyDispatcher:
+    def __init__(self, device, activity, pointer=None):
+        global _layout_keycodes
+
+        self._device = device
+        self._pointer = pointer
+        self._press_handlers = {}
+        self._release_handlers = {}
+
+        if _layout_keycodes is None:
+            _layout_keycodes = _build_layout_keycodes(device.hid_keyboard_layout)
+
+        self._layout_keycodes = _layout_keycodes
+
+        # Only convert the activity into a dictionary once, when it's compiled.
+        activity_dict = dict_from_activity(activity)
+
+        for key_code in function_key.ALL:
+            press_handler, release_handler = self._make_handlers(activity_dict[key_code])
+            self._press_handlers[key_code] = press_handler
+            self._release_handlers[key_code] = release_handler
+
+    def dispatch(self, key_state, key_code):
+        if key_state == STATE_PRESS:
+            handler = self._press_handlers.get(key_code)
+        elif key_state == STATE_RELEASE:
+            handler = self._release_handlers.get(key_code)
+        else:
+            return
+
+        # Should be a standard key from the keyboard
+        if handler is None:
+            self._emit_keyboard_layout_keys(key_state, key_code)
+        else:
+            handler()
+
+    # Bind an action to the HID device it targets, returning a (press, release) handler pair.
+    def _make_handlers(self, action):
+        # Function buttons assigned None do nothing
+        if not action:
+            return (_no_op, _no_op)
+
+        device = self._device
+        code = action.code
+
+        if action.hid_type == function_key.HID_KEYBOARD:
+            hid_keyboard = device.hid_keyboard
+            return (lambda: hid_keyboard.press(code), lambda: hid_keyboard.release(code))
+
+        elif action.hid_type == function_key.HID_KEYBOARD_LAYOUT:
+            keycodes = self._layout_keycodes.get(code)
+
+            if not keycodes:
+                print("No keycodes for", repr(code))
+                return (_no_op, _no_op)
+
+            hid_keyboard = device.hid_keyboard
+            return (lambda: hid_keyboard.press(*keycodes), lambda: hid_keyboard.release(*keycodes))
+
+        elif action.hid_type == function_key.HID_CONSUMER_CONTROL:
+            hid_cc = device.hid_cc
+
+            # Consumer control reports aren't batched either, so send any batched keyboard report first
+            def press():
+                device.flush_hid()
+                hid_cc.press(code)
+                device.record_key_latency(1)
+
+            def release():
+                device.flush_hid()
+                hid_cc.release()
+                device.record_key_latency(1)
+
+            return (press, release)
+
+        elif action.hid_type == function_key.HID_MOUSE:
+            hid_mouse = device.hid_mouse
+            pointer = self._pointer
+
+            # Mouse buttons aren't batched, so send any batched reports and pointer
+            # motion first to keep them in order (e.g. Ctrl + click where the pointer stopped).
+            def press():
+                device.flush_hid()
+
+                if pointer:
+                    pointer.flush()
+
+                hid_mouse.press(code)
+                device.record_key_latency(1)
+
+            def release():
+                device.flush_hid()
+
+                if pointer:
+                    pointer.flush()
+
+                hid_mouse.release(code)
+                device.record_key_latency(1)
+
+            return (press, release)
+
+        return (_no_op, _no_op)
+
+    def _emit_keyboard_layout_keys(self, key_state, layout_key):
+        keycodes = self._layout_keycodes.get(layout_key)
+
+        if keycodes:
+            if key_state == STATE_PRESS:
+                self._device.hid_keyboard.press(*keycodes)
+            elif key_state == STATE_RELEASE:
+                self._device.hid_keyboard.release(*keycodes)
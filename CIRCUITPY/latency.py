@@ -0,0 +1,98 @@
+import time
+from array import array
+
+# Bucket 0 holds 0us, and bucket i holds latencies from 2^(i-1) up to 2^i - 1 microseconds.
+# The last bucket also holds everything longer.
+BUCKET_COUNT = 24
+
+def ticks_us():
+    return time.monotonic_ns() // 1000
+
+def _bucket_for(latency):
+    bucket = 0
+
+    while latency > 0 and bucket < BUCKET_COUNT - 1:
+        latency >>= 1
+        bucket += 1
+
+    return bucket
+
+def _bucket_label(bucket):
+    if bucket == 0:
+        return "0"
+
+    low = 1 << (bucket - 1)
+
+    if bucket == BUCKET_COUNT - 1:
+        return f"{low}+"
+
+    high = (1 << bucket) - 1
+
+    if high == low:
+        return f"{low}"
+
+    return f"{low}-{high}"
+
+##############################
+# LatencyHistogram class
+##############################
+# Log-bucketed histogram of latencies, in microseconds.
+# Off until enabled: microsecond timestamps are long ints, which allocate,
+# so callers only take them while the histogram is enabled.
+class LatencyHistogram:
+    def __init__(self, name):
+        self.enabled = False
+        self._name = name
+        self._buckets = array('L', [0] * BUCKET_COUNT)
+        self._count = 0
+        self._total = 0
+        self._max = 0
+
+    @property
+    def count(self):
+        return self._count
+
+    def record(self, latency):
+        self._buckets[_bucket_for(latency)] += 1
+        self._count += 1
+        self._total += latency
+
+        if latency > self._max:
+            self._max = latency
+
+    def reset(self):
+        for i in range(BUCKET_COUNT):
+            self._buckets[i] = 0
+
+        self._count = 0
+        self._total = 0
+        self._max = 0
+
+    def lines(self):
+        if self._count == 0:
+            return [f"{self._name}: no samples" if self.enabled else f"{self._name}: not measured"]
+
+        lines = [f"{self._name}: {self._count} samples, mean {self._total // self._count}us, max {self._max}us"]
+
+        for bucket in range(BUCKET_COUNT):
+            if self._buckets[bucket]:
+                lines.append(f"{_bucket_label(bucket):>16}us {self._buckets[bucket]}")
+
+        return lines
+
+    # Print the histogram over serial
+    def dump(self):
+        for line in self.lines():
+            print(line)
+
+    # Append the histogram to a text file, e.g. on the SD card
+    def save(self, path):
+        try:
+            with open(path, 'a') as f:
+                for line in self.lines():
+                    f.write(line)
+                    f.write("\n")
+
+            print("Saved", path)
+        except Exception as e:
+            print("Failed to save latency histogram:", e)
@@ -0,0 +1,63 @@
+from adafruit_ticks import ticks_ms, ticks_diff
+
+# The most a single HID mouse report can move along each axis
+MAX_REPORT_MOVE = 127
+
+##############################
+# PointerMotion class
+##############################
+# Accumulates scaled touch deltas between mouse reports, and sends at most one
+# mouse report per report interval. Touch deltas are whole pixels and the
+# sensitivities are whole numbers, so the motion stays in small ints and no
+# floats are allocated per frame. Motion beyond what one report can carry is
+# kept for the next report.
+class PointerMotion:
+    def __init__(self, mouse, sensitivity_x, sensitivity_y, report_interval):
+        self._mouse = mouse
+        self._sensitivity_x = round(sensitivity_x)
+        self._sensitivity_y = round(sensitivity_y)
+        self._report_interval = report_interval
+        self._last_report_time = None
+
+        # Accumulated motion that hasn't been sent yet, in mouse pixels
+        self._x = 0
+        self._y = 0
+
+    @property
+    def report_interval(self):
+        return self._report_interval
+
+    @report_interval.setter
+    def report_interval(self, interval):
+        self._report_interval = interval
+
+    # Accumulate a touch delta, in display pixels
+    def move(self, delta_x, delta_y):
+        self._x += delta_x * self._sensitivity_x
+        self._y += delta_y * self._sensitivity_y
+
+    # Send the accumulated motion if the report interval has elapsed
+    def update(self):
+        if self._last_report_time is not None and ticks_diff(ticks_ms(), self._last_report_time) < self._report_interval:
+            return
+
+        self.flush()
+
+    # Send the accumulated motion now, as much as fits in one report
+    def flush(self):
+        if self._x == 0 and self._y == 0:
+            return
+
+        move_x = min(max(self._x, -MAX_REPORT_MOVE), MAX_REPORT_MOVE)
+        move_y = min(max(self._y, -MAX_REPORT_MOVE), MAX_REPORT_MOVE)
+
+        self._x -= move_x
+        self._y -= move_y
+
+        self._mouse.move(move_x, move_y)
+        self._last_report_time = ticks_ms()
+
+    # Send all of the remaining motion, e.g. when the touch ends
+    def release(self):
+        while self._x or self._y:
+            self.flush()
@@ -0,0 +1,76 @@
+import time
+from adafruit_ticks import ticks_ms
+from device import IDLE_BACKLIGHT_SHUTOFF_DURATION
+
+try:
+    import alarm
+except ImportError:
+    alarm = None
+
+# (idle duration, poll interval) steps, in milliseconds.
+# The longer the device has been idle, the slower its tasks are polled.
+IDLE_POLL_STEPS = (
+    (IDLE_BACKLIGHT_SHUTOFF_DURATION, 20),
+    (60 * 1000, 50),
+    (5 * 60 * 1000, 100),
+)
+
+# Sleeps at least this long (ms) use light sleep while idle; shorter ones just time.sleep()
+LIGHT_SLEEP_MIN_DURATION = 10
+
+##############################
+# PowerManager class
+##############################
+# Slows down scheduled tasks step by step the longer the device is idle, and
+# light sleeps between them, waking on a time alarm. The first key press or touch
+# after idling is read on the next wake, at most one poll interval late (key events
+# wait in the keyboard's FIFO), and brings every task straight back to full rate.
+class PowerManager:
+    def __init__(self, device):
+        self._device = device
+        self._tasks = []
+        self._poll_interval = 0
+
+    @property
+    def poll_interval(self):
+        return self._poll_interval
+
+    @property
+    def is_low_power(self):
+        return self._poll_interval > 0
+
+    # Let the power manager slow a scheduler task down while idle. Returns the task.
+    def add_task(self, task):
+        self._tasks.append((task, task.period))
+        return task
+
+    # Call after every input poll, so that the first interaction restores full rate immediately.
+    def update(self):
+        idle_duration = self._device.idle_duration
+        poll_interval = 0
+
+        for duration, interval in IDLE_POLL_STEPS:
+            if idle_duration >= duration:
+                poll_interval = interval
+
+        if poll_interval == self._poll_interval:
+            return
+
+        self._poll_interval = poll_interval
+        now = ticks_ms()
+
+        for task, base_period in self._tasks:
+            task.period = max(base_period, poll_interval)
+
+            # Coming back to full rate; run everything right away
+            if poll_interval == 0:
+                task.next_run = now
+
+    # Scheduler sleep function
+    def sleep(self, duration):
+        if alarm is None or self._poll_interval == 0 or duration < LIGHT_SLEEP_MIN_DURATION:
+            time.sleep(duration / 1000)
+            return
+
+        time_alarm = alarm.time.TimeAlarm(monotonic_time=time.monotonic() + duration / 1000)
+        alarm.light_sleep_until_alarms(time_alarm)
@@ -1,5 +1,6 @@
 import time
 import displayio
+from collections import namedtuple
 import sprites
 from bbq10keyboard import STATE_PRESS, STATE_RELEASE, STATE_LONG_PRESS
 import function_key
@@ -9,10 +10,18 @@ from user.activities import ACTIVITIES
 from sprite_sheet import SpriteInstance
 
 from mode import Mode
+from profiler import STAGE_TOUCH, STAGE_KEYS, STAGE_UI
+
+# View cache key for the preferences screen
+PREFERENCES_VIEW = "preferences"
+
+# The parts of the preferences screen that are recolored when the UI color changes
+PreferencesView = namedtuple("PreferencesView", ['labels', 'button_icon_views'])
 
 class PreferencesMode(Mode):
-    def __init__(self, device, on_activity_selected):
+    def __init__(self, device, view_cache, on_activity_selected):
         super().__init__(device)
+        self._view_cache = view_cache
         self._on_activity_selected = on_activity_selected
 
     def enter(self):
@@ -20,13 +29,27 @@ class PreferencesMode(Mode):
 
         display = self.device.display_controller
 
-        self._group = displayio.Group()
-        self._labels = []
-        self._button_icon_views = []
+        # Built the first time preferences are opened, then kept in the view cache
+        view = self._view_cache.show(
+            PREFERENCES_VIEW,
+            self._build_view,
+            display.color_index,
+            recolor_fn=self._recolor_view
+        )
+
+        self._labels = view.labels
+        self._button_icon_views = view.button_icon_views
+
+    # Build the preferences screen into 'group'
+    def _build_view(self, group):
+        display = self.device.display_controller
+
+        labels = []
+        button_icon_views = []
 
         # Title
         new_label = display.add_label(
-            to_group=self._group,
+            to_group=group,
             text="Select Activity",
             x=0,
             y=0,
@@ -35,7 +58,7 @@ class PreferencesMode(Mode):
             padding=True,
             scale=2
         )
-        self._labels.append(new_label)
+        labels.append(new_label)
 
         # Activity title labels
         ACTIVITY_Y = display.layout.height // 2 - 50
@@ -43,70 +66,72 @@ class PreferencesMode(Mode):
 
         for i in range(4):
             new_label = display.add_label(
-                to_group=self._group,
+                to_group=group,
                 text=f"{i + 1}: {ACTIVITIES[i].name}",
                 x=display.layout.DBUTTON_X,
                 y=ACTIVITY_Y + i * ACTIVITY_SPACING,
                 scale=2
             )
-            self._labels.append(new_label)
+            labels.append(new_label)
 
         # L1 button icon
         new_icon = display.add_icon(
-            to_group=self._group,
+            to_group=group,
             content="1",
             x=display.layout.L1_X, 
             y=display.layout.BUTTON_ICON_Y,
             h_align=display.ALIGN_LEADING
         )
-        self._button_icon_views.append(new_icon.view)
+        button_icon_views.append(new_icon.view)
 
         # L2 button icon
         new_icon = display.add_icon(
-            to_group=self._group,
+            to_group=group,
             content="2",
             x=display.layout.L2_X, 
             y=display.layout.BUTTON_ICON_Y,
             h_align=display.ALIGN_LEADING
         )
-        self._button_icon_views.append(new_icon.view)
+        button_icon_views.append(new_icon.view)
 
         # R1 button icon
         new_icon = display.add_icon(
-            to_group=self._group,
+            to_group=group,
             content="3",
             x=display.layout.R1_X, 
             y=display.layout.BUTTON_ICON_Y,
             h_align=display.ALIGN_TRAILING
         )
-        self._button_icon_views.append(new_icon.view)
+        button_icon_views.append(new_icon.view)
 
         # R2 button icon
         new_icon = display.add_icon(
-            to_group=self._group,
+            to_group=group,
             content="4",
             x=display.layout.R2_X, 
             y=display.layout.BUTTON_ICON_Y,
             h_align=display.ALIGN_TRAILING
         )
-        self._button_icon_views.append(new_icon.view)
+        button_icon_views.append(new_icon.view)
 
-        # Finally, add our group to the root group
-        display.root_group.append(self._group)
+        return PreferencesView(labels=labels, button_icon_views=button_icon_views)
 
     def update(self):
         device = self.device
         touch_screen = device.touch_screen
         display = device.display_controller
+        profiler = device.profiler
 
         # Update the touch pad
         touch_screen.update()
+        profiler.lap(STAGE_TOUCH)
 
         # Read keys from the keyboard
-        key_count, key_events = device.read_keys()
+        key_events = device.read_keys()
+        profiler.lap(STAGE_KEYS)
 
         # Keep device from idling if input is received
-        if touch_screen.touched or (key_count > 0):
+        if touch_screen.touched or key_events:
             device.did_interact()
 
         # We'll set this to true if the UI color changes
@@ -160,13 +185,12 @@ class PreferencesMode(Mode):
 
                     self._set_brightness(brightness_index)
 
-    def exit(self):
-        display = self.device.display_controller
+        profiler.lap(STAGE_UI)
 
-        display.root_group.remove(self._group)
-        self._group = None
+    def exit(self):
+        self._view_cache.hide()
         self._labels = None
-        self._sprites = None
+        self._button_icon_views = None
 
     def _set_color(self, color_index):
         device = self.device
@@ -178,17 +202,25 @@ class PreferencesMode(Mode):
         device.invalidate_battery()
         device.update()
 
-        # Change all the label colors
-        for label in self._labels:
+        self._recolor_view(PreferencesView(labels=self._labels, button_icon_views=self._button_icon_views))
+
+        # This screen is up to date with the new color, so the view cache can keep it
+        self._view_cache.recolored(PREFERENCES_VIEW, color_index)
+        display.invalidate()
+
+    # Sprites use the UI palette, so they change color with it.
+    # Labels each have their own palette, so change all the label colors.
+    def _recolor_view(self, view):
+        display = self.device.display_controller
+
+        for label in view.labels:
             label.color = display.foreground_color
 
-        # Change all of the button icon colors
-        for view in self._button_icon_views:
-            if isinstance(view, SpriteInstance):
-                view.tilegrid.pixel_shader = display.palette
-            else:
-                view.color = display.background_color
-                view.background_color = display.foreground_color
+        # Change the text button icon colors
+        for icon_view in view.button_icon_views:
+            if not isinstance(icon_view, SpriteInstance):
+                icon_view.color = display.background_color
+                icon_view.background_color = display.foreground_color
 
     def _set_brightness(self, brightness_index):
         device = self.device
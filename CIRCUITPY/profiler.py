@@ -0,0 +1,207 @@
+import gc
+from array import array
+from adafruit_ticks import ticks_ms, ticks_diff
+from latency import ticks_us
+
+##############################
+# Stages
+##############################
+STAGE_DEVICE = 0
+STAGE_TOUCH = 1
+STAGE_KEYS = 2
+STAGE_HID = 3
+STAGE_UI = 4
+STAGE_DISPLAY = 5
+
+STAGE_NAMES = ("device", "touch", "keys", "hid", "ui", "disp")
+STAGE_COUNT = len(STAGE_NAMES)
+
+# Number of timings kept per stage
+HISTORY_SIZE = 64
+
+# How often the overlay refreshes its numbers (ms)
+OVERLAY_REFRESH_INTERVAL = 500
+
+##############################
+# Profiler class
+##############################
+# Times each stage of the main loop into a fixed-size ring buffer per stage,
+# along with the bytes allocated (gc.mem_alloc() delta) during the stage.
+# Call begin() at the start of a frame, then lap(stage) after each stage;
+# the time and allocations since the previous lap are recorded for that stage.
+# Does nothing until enabled, so it costs nothing in normal use.
+#
+# A frame is "steady state" unless something calls expect_allocations() during it,
+# e.g. because it handled key events or a connection change. Stages that allocate
+# in steady state frames are flagged, and with assert_no_allocations set, raise.
+class Profiler:
+    def __init__(self, history_size=HISTORY_SIZE):
+        self.enabled = False
+        self.assert_no_allocations = False
+        self._history_size = history_size
+        self._history = [array('L', [0] * history_size) for _ in range(STAGE_COUNT)]
+        self._alloc_history = [array('L', [0] * history_size) for _ in range(STAGE_COUNT)]
+        self._counts = [0] * STAGE_COUNT
+        self._indices = [0] * STAGE_COUNT
+        self._steady_allocations = [0] * STAGE_COUNT
+        self._lap_start = 0
+        self._lap_alloc = 0
+        self._steady = True
+
+    def begin(self):
+        if self.enabled:
+            self._steady = True
+            self._lap_start = ticks_us()
+            self._lap_alloc = gc.mem_alloc()
+
+    # Call when the current frame is expected to allocate
+    def expect_allocations(self):
+        self._steady = False
+
+    def lap(self, stage):
+        if not self.enabled:
+            return
+
+        # Read the heap before the timer, so the profiler's own allocations aren't counted
+        allocated = gc.mem_alloc() - self._lap_alloc
+        now = ticks_us()
+
+        # The heap shrinks if a collection ran during the stage; there's no telling what it allocated
+        if allocated < 0:
+            allocated = 0
+
+        self.record(stage, now - self._lap_start, allocated)
+
+        if allocated > 0 and self._steady:
+            self._steady_allocations[stage] += 1
+
+            if self.assert_no_allocations:
+                raise RuntimeError(f"{STAGE_NAMES[stage]} stage allocated {allocated} bytes in a steady state frame")
+
+        self._lap_start = now
+        self._lap_alloc = gc.mem_alloc()
+
+    # Record a timing, in microseconds, and the bytes allocated
+    def record(self, stage, duration, allocated=0):
+        index = self._indices[stage]
+        self._history[stage][index] = duration
+        self._alloc_history[stage][index] = allocated
+        index += 1
+
+        if index == self._history_size:
+            index = 0
+
+        self._indices[stage] = index
+
+        if self._counts[stage] < self._history_size:
+            self._counts[stage] += 1
+
+    def reset(self):
+        for stage in range(STAGE_COUNT):
+            self._counts[stage] = 0
+            self._indices[stage] = 0
+            self._steady_allocations[stage] = 0
+
+    # Returns (min, mean, p95, max) for the stage, in microseconds, or None if nothing was recorded.
+    def stats(self, stage):
+        count = self._counts[stage]
+
+        if count == 0:
+            return None
+
+        timings = sorted(self._history[stage][:count])
+        p95 = timings[min(count - 1, (count * 95) // 100)]
+        return (timings[0], sum(timings) // count, p95, timings[-1])
+
+    # Returns (mean, max) bytes allocated per lap of the stage, or None if nothing was recorded.
+    def allocation_stats(self, stage):
+        count = self._counts[stage]
+
+        if count == 0:
+            return None
+
+        allocations = self._alloc_history[stage][:count]
+        return (sum(allocations) // count, max(allocations))
+
+    # Number of steady state frames in which the stage allocated, since the last reset
+    def steady_allocations(self, stage):
+        return self._steady_allocations[stage]
+
+##############################
+# ProfilerOverlay class
+##############################
+# Compact on-screen table of the profiler's stats, on top of everything else
+# in the display's root group. Hidden until toggled.
+class ProfilerOverlay:
+    def __init__(self, display_controller, profiler):
+        self._display_controller = display_controller
+        self._profiler = profiler
+        self._label = None
+        self._last_refresh_time = None
+
+    @property
+    def visible(self):
+        return self._label is not None
+
+    def toggle(self):
+        display = self._display_controller
+
+        if self._label is None:
+            self._profiler.reset()
+            self._profiler.enabled = True
+
+            self._label = display.add_label(
+                to_group=display.root_group,
+                text=self._stats_text(),
+                x=0,
+                y=display.layout.height // 2,
+                h_align=display.ALIGN_LEADING,
+                color=0xFFFFFF,
+                background_color=0x000000
+            )
+            self._last_refresh_time = ticks_ms()
+            display.invalidate()
+        else:
+            display.root_group.remove(self._label)
+            self._label = None
+            display.invalidate()
+
+            # Keep profiling if allocations are being asserted
+            self._profiler.enabled = self._profiler.assert_no_allocations
+
+    def update(self):
+        if self._label is None:
+            return
+
+        now = ticks_ms()
+
+        if ticks_diff(now, self._last_refresh_time) < OVERLAY_REFRESH_INTERVAL:
+            return
+
+        self._last_refresh_time = now
+
+        # Keep the overlay on top of groups added after it
+        root_group = self._display_controller.root_group
+
+        if root_group[len(root_group) - 1] is not self._label:
+            root_group.remove(self._label)
+            root_group.append(self._label)
+
+        self._label.text = self._stats_text()
+        self._display_controller.invalidate()
+
+    # Stages that allocate in steady state frames are marked with '!'
+    def _stats_text(self):
+        lines = ["stage    min  avg  p95  max us  alloc B"]
+
+        for stage in range(STAGE_COUNT):
+            stats = self._profiler.stats(stage)
+
+            if stats is None:
+                lines.append(f"{STAGE_NAMES[stage]:<6}   -")
+            else:
+                allocation_stats = self._profiler.allocation_stats(stage)
+                flag = "!" if self._profiler.steady_allocations(stage) else ""
+                lines.append(f"{STAGE_NAMES[stage]:<6} {stats[0]:>4} {stats[1]:>4} {stats[2]:>4} {stats[3]:>4} {allocation_stats[0]:>5}{flag}")
+
+        return "\n".join(lines)
@@ -1,30 +1,52 @@
 import displayio
+from collections import namedtuple
 from adafruit_ticks import ticks_ms, ticks_diff
+from adafruit_display_text.label import Label
 from user import colors
 import sprites
-import function_key
-from activity import dict_from_activity
+from key_dispatch import KeyDispatcher
+from pointer_motion import PointerMotion
 from sprite_sheet import SpriteSheet
-from bbq10keyboard import STATE_PRESS, STATE_RELEASE, STATE_LONG_PRESS
 
 from mode import Mode
+from profiler import STAGE_TOUCH, STAGE_KEYS, STAGE_HID, STAGE_UI
 
 CONFIG_HOLD_DURATION = 1500
 
-MOUSE_SENSITIVITY_X = 3.0
-MOUSE_SENSITIVITY_Y = 3.0
+# Mouse pixels moved per display pixel of touch movement. Whole numbers, so moving the pointer stays in integer math.
+MOUSE_SENSITIVITY_X = 3
+MOUSE_SENSITIVITY_Y = 3
+
+# Minimum time between mouse movement reports, in milliseconds.
+# Motion is accumulated between reports, so nothing is lost.
+MOUSE_REPORT_INTERVAL = 10
 
 BLUETOOTH_ANIMATION_FRAME_DELAY = 500
 BLUETOOTH_ANIMATION_FRAMES = [sprites.BT_01, sprites.BT_02, sprites.BT_03, sprites.BT_04]
 BLUETOOTH_ANIMATION_FRAME_COUNT = len(BLUETOOTH_ANIMATION_FRAMES)
 
+# View cache key for remote mode screens, paired with the activity index
+REMOTE_VIEW = "remote"
+
+# The parts of a remote mode screen that change after it's built
+RemoteView = namedtuple("RemoteView", ['connected_group', 'disconnected_group', 'title_label', 'bt_sprite'])
+
 class RemoteMode(Mode):
-    def __init__(self, device, on_goto_prefs):
+    def __init__(self, device, view_cache, on_goto_prefs):
         super().__init__(device)
+        self._view_cache = view_cache
         self._on_goto_prefs = on_goto_prefs
 
+        # Connection state groups, in this activity's cached screen
+        self._connected_group = None
+        self._disconnected_group = None
+
         # Title-label-as-config-button
         self._title_label = None
+        self._title_left = 0
+        self._title_top = 0
+        self._title_right = 0
+        self._title_bottom = 0
         self._was_touched = False
         self._is_title_pressed = False
         self._title_press_start_time = None
@@ -34,20 +56,60 @@ class RemoteMode(Mode):
         self._bt_animation_timer = 0
         self._bt_sprite = None
 
+        # Key event to HID event translation, compiled from the activity in enter()
+        self._key_dispatcher = None
+
+        # Mouse movement
+        self._pointer = PointerMotion(
+            mouse=device.hid_mouse,
+            sensitivity_x=MOUSE_SENSITIVITY_X,
+            sensitivity_y=MOUSE_SENSITIVITY_Y,
+            report_interval=MOUSE_REPORT_INTERVAL
+        )
+
     def enter(self):
         print("RemoteMode")
 
         device = self.device
         display = self.device.display_controller
 
+        # Compile the selected activity's key handlers once, rather than every frame
+        self._key_dispatcher = KeyDispatcher(device, device.activity, pointer=self._pointer)
+
+        # Each activity's screen is built the first time it's used, then kept in the view cache
+        view = self._view_cache.show(
+            (REMOTE_VIEW, device.activity_index),
+            self._build_view,
+            display.color_index,
+            recolor_fn=self._recolor_view
+        )
+
+        self._connected_group = view.connected_group
+        self._disconnected_group = view.disconnected_group
+        self._title_label = view.title_label
+        self._bt_sprite = view.bt_sprite
+
+        # The title doesn't move, so its touch bounds are worked out once
+        self._title_left, self._title_top = self._title_label.anchored_position
+        self._title_right = self._title_left + self._title_label.width * self._title_label.scale
+        self._title_bottom = self._title_top + self._title_label.height * self._title_label.scale
+
+        # Display the appropriate group based on BLE connection status
+        self._update_group_visibility()
+
+    # Build the current activity's screen into 'group'
+    def _build_view(self, group):
+        device = self.device
+        display = self.device.display_controller
+
         # Set up connected group
-        self._connected_group = displayio.Group()
-        self._connected_group.hidden = True
-        display.root_group.append(self._connected_group)
+        connected_group = displayio.Group()
+        connected_group.hidden = True
+        group.append(connected_group)
 
         # Activity label
-        self._title_label = display.add_label(
-            to_group=self._connected_group,
+        title_label = display.add_label(
+            to_group=connected_group,
             text=f"{device.activity.name}",
             x=0,
             y=0,
@@ -60,14 +122,14 @@ class RemoteMode(Mode):
         # Touch label and icon
         if device.activity.show_mouse_message:
             touch_label = display.add_label(
-                to_group=self._connected_group,
+                to_group=connected_group,
                 text="Touch screen to move mouse",
                 x=display.layout.DBUTTON_X + SpriteSheet.SPRITE_WIDTH // 2,
                 y=display.layout.TOUCH_SCREEN_LABEL_Y                
             )
 
             display.add_sprite(
-                to_group=self._connected_group, 
+                to_group=connected_group, 
                 sprite_frame=sprites.TOUCH_SCREEN,
                 x=display.layout.DBUTTON_X - (touch_label.width - SpriteSheet.SPRITE_WIDTH) // 2,
                 y=display.layout.TOUCH_SCREEN_LABEL_Y + 2,
@@ -78,7 +140,7 @@ class RemoteMode(Mode):
         event = device.activity.L1
         if event:
             display.add_icon(
-                to_group=self._connected_group,
+                to_group=connected_group,
                 content=event.icon, 
                 x=display.layout.L1_X, 
                 y=display.layout.BUTTON_ICON_Y,
@@ -89,7 +151,7 @@ class RemoteMode(Mode):
         event = device.activity.L2
         if event:
             display.add_icon(
-                to_group=self._connected_group,
+                to_group=connected_group,
                 content=event.icon, 
                 x=display.layout.L2_X, 
                 y=display.layout.BUTTON_ICON_Y,
@@ -100,7 +162,7 @@ class RemoteMode(Mode):
         event = device.activity.R1
         if event:
             display.add_icon(
-                to_group=self._connected_group,
+                to_group=connected_group,
                 content=event.icon, 
                 x=display.layout.R1_X, 
                 y=display.layout.BUTTON_ICON_Y,
@@ -112,7 +174,7 @@ class RemoteMode(Mode):
         event = device.activity.R2
         if event:
             display.add_icon(
-                to_group=self._connected_group,
+                to_group=connected_group,
                 content=event.icon, 
                 x=display.layout.R2_X, 
                 y=display.layout.BUTTON_ICON_Y,
@@ -124,7 +186,7 @@ class RemoteMode(Mode):
         event = device.activity.SELECT
         if event:
             select_icon = display.add_icon(
-                to_group=self._connected_group,
+                to_group=connected_group,
                 content=event.icon, 
                 x=display.layout.DBUTTON_X,
                 y=display.layout.DBUTTON_Y
@@ -145,7 +207,7 @@ class RemoteMode(Mode):
         event = device.activity.UP
         if event:
             display.add_icon(
-                to_group=self._connected_group,
+                to_group=connected_group,
                 content=event.icon, 
                 x=display.layout.DBUTTON_X,
                 y=display.layout.DBUTTON_Y - DBUTTON_ICON_SPACE_Y,
@@ -156,7 +218,7 @@ class RemoteMode(Mode):
         event = device.activity.RIGHT
         if event:
             display.add_icon(
-                to_group=self._connected_group,
+                to_group=connected_group,
                 content=event.icon, 
                 x=display.layout.DBUTTON_X + DBUTTON_ICON_SPACE_X, 
                 y=display.layout.DBUTTON_Y,
@@ -167,7 +229,7 @@ class RemoteMode(Mode):
         event = device.activity.DOWN
         if event:
             display.add_icon(
-                to_group=self._connected_group,
+                to_group=connected_group,
                 content=event.icon, 
                 x=display.layout.DBUTTON_X,
                 y=display.layout.DBUTTON_Y + DBUTTON_ICON_SPACE_Y,
@@ -178,7 +240,7 @@ class RemoteMode(Mode):
         event = device.activity.LEFT
         if event:
             display.add_icon(
-                to_group=self._connected_group,
+                to_group=connected_group,
                 content=event.icon, 
                 x=display.layout.DBUTTON_X - DBUTTON_ICON_SPACE_X, 
                 y=display.layout.DBUTTON_Y,
@@ -186,44 +248,54 @@ class RemoteMode(Mode):
             )
 
         # Set up disconnected group
-        self._disconnected_group = displayio.Group()
-        self._disconnected_group.hidden = True
-        display.root_group.append(self._disconnected_group)        
+        disconnected_group = displayio.Group()
+        disconnected_group.hidden = True
+        group.append(disconnected_group)
 
         # Bluetooth connecting animation in disconnected group
-        self._bt_sprite = display.add_sprite(
-            to_group=self._disconnected_group,
+        bt_sprite = display.add_sprite(
+            to_group=disconnected_group,
             sprite_frame=BLUETOOTH_ANIMATION_FRAMES[0],
             x=display.layout.DBUTTON_X,
             y=display.layout.height // 2,
-            palette=colors.make_palette(colors.BLUE),
+            palette=colors.get_palette(colors.BLUE),
             scale=2
         )
 
-        # Display the appropriate group based on BLE connection status
-        self._update_group_visibility()
+        return RemoteView(
+            connected_group=connected_group,
+            disconnected_group=disconnected_group,
+            title_label=title_label,
+            bt_sprite=bt_sprite
+        )
 
     def update(self):
         device = self.device
         touch_screen = self.device.touch_screen        
+        profiler = device.profiler
 
         # Update group visibility if connection status changes
         if device.connection_status_changed:
             self._update_group_visibility()
 
+        profiler.lap(STAGE_UI)
+
         # Update the touch pad
         touch_screen.update()
+        profiler.lap(STAGE_TOUCH)
 
         # Read keys from the keyboard
-        key_count, key_events = device.read_keys()
+        key_events = device.read_keys()
+        profiler.lap(STAGE_KEYS)
 
         # Keep device from idling if input is received
-        if touch_screen.touched or (key_count > 0):
+        if touch_screen.touched or key_events:
             device.did_interact()
 
         # Nothing else to do if we aren't connected.
         if not device.is_connected:
             self._update_bt_animation()
+            profiler.lap(STAGE_UI)
             return
 
         # Check to see if the title label is touched and held.
@@ -234,59 +306,54 @@ class RemoteMode(Mode):
                 self._on_goto_prefs = None
             return
 
+        profiler.lap(STAGE_UI)
+
         # Move the mouse, if the title button is not currently pressed.
         if touch_screen.touch_moved and not self._is_title_pressed:
-            delta_x, delta_y = touch_screen.touch_delta
-            delta_x = int(delta_x * MOUSE_SENSITIVITY_X)
-            delta_y = int(delta_y * MOUSE_SENSITIVITY_Y)
-            device.hid_mouse.move(delta_x, delta_y)
+            self._pointer.move(touch_screen.touch_delta_x, touch_screen.touch_delta_y)
 
-        # convert activity into a dictionary so we can query for the activity's keys
-        config_dict = dict_from_activity(device.activity)
+        # Send accumulated mouse movement at most once per report interval,
+        # and don't carry sub-pixel movement over into the next touch.
+        if touch_screen.touched:
+            self._pointer.update()
+        else:
+            self._pointer.release()
 
         # Translate hardware keyboard/button events into HID keyboard, consumer control, or mouse button events.
         for key_state, key_code in key_events:
-            # If this is a function key
-            if key_code in config_dict:
-                event = config_dict[key_code]
-
-                if event:
-                    if event.hid_type == function_key.HID_KEYBOARD:
-                        if key_state == STATE_PRESS:
-                            device.hid_keyboard.press(event.code)
-                        elif key_state == STATE_RELEASE:
-                            device.hid_keyboard.release(event.code)
-
-                    elif event.hid_type == function_key.HID_KEYBOARD_LAYOUT:
-                        self._emit_keyboard_layout_keys(key_state, event.code)
-
-                    elif event.hid_type == function_key.HID_CONSUMER_CONTROL:
-                        if key_state == STATE_PRESS:
-                            device.hid_cc.press(event.code)
-                        elif key_state == STATE_RELEASE:
-                            device.hid_cc.release()
-
-                    elif event.hid_type == function_key.HID_MOUSE:
-                        if key_state == STATE_PRESS:
-                            device.hid_mouse.press(event.code)
-                        elif key_state == STATE_RELEASE:
-                            device.hid_mouse.release(event.code)
-
-            # Should be a standard key from the keyboard
-            else:
-                self._emit_keyboard_layout_keys(key_state, key_code)
+            self._key_dispatcher.dispatch(key_state, key_code)
 
-    def exit(self):
+        # Send the reports for all of this frame's key events at once
+        device.flush_hid()
+        profiler.lap(STAGE_HID)
+
+    # Bring a cached screen up to date with the UI color. Sprites use the UI palette,
+    # so they're already up to date; labels each have their own palette.
+    def _recolor_view(self, view):
         display = self.device.display_controller
 
-        display.root_group.remove(self._connected_group)
-        self._connected_group = None
+        for item in view.connected_group:
+            if isinstance(item, Label):
+                # Text icons are inverted. Other than the title, once it's been pressed,
+                # they're the only labels with a background.
+                if item is view.title_label or item.background_color is None:
+                    item.color = display.foreground_color
+                else:
+                    item.color = display.background_color
+                    item.background_color = display.foreground_color
 
-        display.root_group.remove(self._disconnected_group)
-        self._disconnected_group = None
+    def exit(self):
+        # The screen is kept for next time, so don't leave the title highlighted
+        if self._is_title_pressed:
+            self._is_title_pressed = False
+            self._set_label_color_inverted(self._title_label, False)
 
+        self._view_cache.hide()
+        self._connected_group = None
+        self._disconnected_group = None
         self._bt_sprite = None
         self._title_label = None
+        self._key_dispatcher = None
 
     def _update_group_visibility(self):
         if self.device.is_connected:
@@ -297,20 +364,7 @@ class RemoteMode(Mode):
             self._disconnected_group.hidden = False
             self._start_bt_animation()
 
-    def _emit_keyboard_layout_keys(self, key_state, layout_key):
-        device = self.device
-        keycodes = None
-
-        try:
-            keycodes = device.hid_keyboard_layout.keycodes(layout_key)
-        except Exception as e:
-            print(e)
-
-        if keycodes:
-            if key_state == STATE_PRESS:
-                device.hid_keyboard.press(*keycodes)
-            elif key_state == STATE_RELEASE:
-                device.hid_keyboard.release(*keycodes)
+        self.device.display_controller.invalidate()
 
     def _set_label_color_inverted(self, label, inverted):
         display = self.device.display_controller
@@ -322,34 +376,42 @@ class RemoteMode(Mode):
             label.color = display.foreground_color
             label.background_color = display.background_color
 
-    def _label_contains_point(self, label, point):
-        x, y = label.anchored_position
-        return (x <= point[0] <= x + label.width * label.scale) and (y <= point[1] <= y + label.height * label.scale)
+        display.invalidate()
+
+    def _title_contains_point(self, x, y):
+        return (self._title_left <= x <= self._title_right) and (self._title_top <= y <= self._title_bottom)
 
     def _check_config_selected(self):
         touch_screen = self.device.touch_screen
+        profiler = self.device.profiler
 
-        touch_point = touch_screen.touch_point
-        is_touched = touch_point is not None
+        is_touched = touch_screen.touched
 
         if is_touched:
+            touch_x = touch_screen.touch_x
+            touch_y = touch_screen.touch_y
+
             if self._was_touched:
                 if self._is_title_pressed:
-                    if self._label_contains_point(self._title_label, touch_point):
+                    if self._title_contains_point(touch_x, touch_y):
                         now = ticks_ms()
 
                         if ticks_diff(now, self._title_press_start_time) > CONFIG_HOLD_DURATION:
+                            profiler.expect_allocations()
                             return True
                     else:
+                        profiler.expect_allocations()
                         self._is_title_pressed = False
                         self._set_label_color_inverted(self._title_label, False)
             else:
-                if self._label_contains_point(self._title_label, touch_point):
+                if self._title_contains_point(touch_x, touch_y):
+                    profiler.expect_allocations()
                     self._is_title_pressed = True
                     self._set_label_color_inverted(self._title_label, True)
                     self._title_press_start_time = ticks_ms()
         else:
             if self._is_title_pressed:
+                profiler.expect_allocations()
                 self._is_title_pressed = False
                 self._set_label_color_inverted(self._title_label, False)
 
@@ -377,4 +439,6 @@ class RemoteMode(Mode):
         if self._bt_sprite_frame >= BLUETOOTH_ANIMATION_FRAME_COUNT:
             self._bt_sprite_frame = 0
 
-        self._bt_sprite.tilegrid[0] = BLUETOOTH_ANIMATION_FRAMES[self._bt_sprite_frame]
\ No newline at end of file
+        display = self.device.display_controller
+        display.sprite_sheet.set_frame(self._bt_sprite, BLUETOOTH_ANIMATION_FRAMES[self._bt_sprite_frame])
+        display.invalidate()
\ No newline at end of file
@@ -1,10 +1,26 @@
 # Import the bare minimum to get started.
 # We'll import everything else as we need it so we can prioritize
-# getting something on the screen ASAP, as it can take 7-10 seconds
-# to import and initialize everything.
+# getting BLE advertising and something on the screen ASAP, as it
+# can take 7-10 seconds to import and initialize everything.
 import board
 import time
 
+# Times each phase of startup; see the boot log section at the end
+from boot_timer import boot_timer
+
+##############################
+# BLE
+##############################
+# Start advertising before anything else, so a bonded host can reconnect
+# while the rest of the UI loads. The HID devices are handed to Device later.
+from ble_hid import BLEHID
+from user.config import CONFIG
+
+ble_hid = BLEHID(name=CONFIG.ble_name)
+
+boot_timer.phase("ble")
+
+
 ##############################
 # I2C
 ############################## 
@@ -46,6 +62,8 @@ neopixel = NeoPixel(board.D11, 1)
 # Sometimes the NeoPixel starts up with random values, so make sure it's turned off.
 neopixel.fill(0)
 
+boot_timer.phase("keyboard")
+
 
 ##############################
 # SPI
@@ -75,9 +93,41 @@ displayio.release_displays()
 display_bus = displayio.FourWire(spi, command=board.D10, chip_select=board.D9)
 display = ILI9341(display_bus, width=320, height=240)
 
+# Set to True to load the sprite sheet into RAM, so icons aren't read from flash whenever the
+# display redraws them. Off by default: it imports adafruit_imageload and decodes the whole
+# sheet at boot, which adds to startup time. If there isn't enough memory, the sheet is read
+# from flash as usual.
+SPRITES_IN_MEMORY = False
+
+# Load only the sprite frames the UI and the activities use, instead of the whole sheet
+SPRITES_USED_ONLY = False
+
+sprite_frames = None
+
+if SPRITES_IN_MEMORY and SPRITES_USED_ONLY:
+    import sprites
+    from activity import activity_sprite_frames
+    from user.activities import ACTIVITIES
+
+    # Battery, Bluetooth connecting animation, and touch screen icons
+    sprite_frames = activity_sprite_frames(ACTIVITIES)
+    sprite_frames.update((
+        sprites.BATTERY_FULL,
+        sprites.BATTERY_LOW,
+        sprites.BT_01,
+        sprites.BT_02,
+        sprites.BT_03,
+        sprites.BT_04,
+        sprites.TOUCH_SCREEN
+    ))
+
 # Display controller
 from display_controller import DisplayController
-display_controller = DisplayController(display=display)
+display_controller = DisplayController(
+    display=display,
+    sprites_in_memory=SPRITES_IN_MEMORY,
+    sprite_frames=sprite_frames
+)
 
 
 ##############################
@@ -92,9 +142,14 @@ loading_label = display_controller.add_label(
     scale = 2
 )
 
+# The display controller turns auto refresh off, so draw the label before turning the backlight on
+display_controller.refresh()
+
 # Turn on display backlight at default brightness
 keyboard.display_backlight = brightness.DEFAULT_DISPLAY
 
+boot_timer.phase("display")
+
 
 ##############################
 # SD Card/File system
@@ -117,6 +172,8 @@ if sd_card_detected:
     except:
         sd_card_detected = False
 
+boot_timer.phase("sd")
+
 # Turn neopixel back off in case it was turned on for activity select indication
 neopixel.fill(0)
 
@@ -133,12 +190,24 @@ from user.activities import ACTIVITIES
 Preferences = namedtuple('Preferences', [
     'activity_index', 
     'color_index',
-    'brightness_index'
+    'brightness_index',
+    'hardware_revision'
 ])
 
 # Our preferences info is saved here
 PREFS_FILE = 'sd/prefs.dat'
 
+# Activity, color and brightness indices, then the hardware revision.
+# Files saved before the hardware revision was added are 3 bytes long.
+PREFS_FORMAT = 'BBBB'
+PREFS_SIZE = struct.calcsize(PREFS_FORMAT)
+
+# Keyboard Featherwing revision, saved so the right touch controller driver
+# can be used without probing for the other one first
+HARDWARE_REVISION_UNKNOWN = 0
+HARDWARE_REV1 = 1
+HARDWARE_REV2 = 2
+
 # Handy in case we need to delete it for some reason
 # try:
 #     os.remove(PREFS_FILE)
@@ -152,13 +221,19 @@ def load_prefs():
     if sd_card_detected:
         try:
             with open(PREFS_FILE, 'rb') as f:
-                packed = f.read(3)
-                unpacked = struct.unpack('BBB', packed)
+                packed = f.read(PREFS_SIZE)
+
+                # Older files don't have the hardware revision
+                if len(packed) == PREFS_SIZE - 1:
+                    packed += bytes((HARDWARE_REVISION_UNKNOWN,))
+
+                unpacked = struct.unpack(PREFS_FORMAT, packed)
 
                 preferences = Preferences(
                     activity_index=min(unpacked[0], len(ACTIVITIES) - 1),
                     color_index=min(unpacked[1], len(colors.ALL) - 1),
-                    brightness_index=min(unpacked[2], brightness.MAX_INDEX)
+                    brightness_index=min(unpacked[2], brightness.MAX_INDEX),
+                    hardware_revision=unpacked[3]
                 )
 
                 print(f"Loaded {preferences}")
@@ -167,16 +242,21 @@ def load_prefs():
         except Exception as e:
             print("Error loading preferences:", e)
 
-    return Preferences(activity_index=0, color_index=0, brightness_index=brightness.DEFAULT_INDEX)
+    return Preferences(
+        activity_index=0,
+        color_index=0,
+        brightness_index=brightness.DEFAULT_INDEX,
+        hardware_revision=HARDWARE_REVISION_UNKNOWN
+    )
 
 # Save current preferences to SD card
-def save_prefs(activity_index, color_index, brightness_index):
+def save_prefs(activity_index, color_index, brightness_index, hardware_revision):
     global sd_card_detected
 
     if sd_card_detected:
         try:
             with open(PREFS_FILE, 'wb') as f:
-                packed = struct.pack('BBB', activity_index, color_index, brightness_index)
+                packed = struct.pack(PREFS_FORMAT, activity_index, color_index, brightness_index, hardware_revision)
                 f.write(packed)
                 print("Saved preferences")
         except Exception as e:
@@ -188,6 +268,7 @@ loaded_prefs = load_prefs()
 # Set the UI color for the display controller
 display_controller.color_index = loaded_prefs.color_index
 loading_label.color = display_controller.foreground_color
+display_controller.refresh()
 
 # Update the display, keyboard, and neopixel brightness.
 # When we create the Device object we'll hand over the brightness duties,
@@ -196,27 +277,86 @@ keyboard.display_backlight = brightness.get_display_brightness(loaded_prefs.brig
 keyboard.keyboard_backlight = brightness.get_keyboard_brightness(loaded_prefs.brightness_index)
 neopixel.brightness = brightness.get_neopixel_brightness(loaded_prefs.brightness_index)
 
+boot_timer.phase("prefs")
+
 
 ##############################
 # Touch screen
 ##############################
-# First try TSC2004 from Rev2
-try:
+# Each of these imports and creates the touch controller driver for one hardware revision,
+# returning (touch_input, is_touched_fn, sample_pending_fn). They raise if the controller isn't there.
+
+# TSC2004 from Rev2
+def init_tsc2004():
     from tsc2004 import TSC2004
     touch_input = TSC2004(i2c)
 
     def is_touched_fn():
          return touch_input.touched
-except:
-    # If not found, try Rev1 STMPE610
-    try:
-        from adafruit_stmpe610 import Adafruit_STMPE610_SPI
-        touch_input = Adafruit_STMPE610_SPI(spi, digitalio.DigitalInOut(board.D6))
 
-        def is_touched_fn(): 
-            return not touch_input.buffer_empty
-    except:
-        raise Exception("Touch screen input device not found")
+    # Samples are read on demand, there's no FIFO to drain
+    return (touch_input, is_touched_fn, None)
+
+# STMPE610 from Rev1
+def init_stmpe610():
+    from adafruit_stmpe610 import Adafruit_STMPE610_SPI
+    touch_input = Adafruit_STMPE610_SPI(spi, digitalio.DigitalInOut(board.D6))
+
+    def is_touched_fn(): 
+        return touch_input.touched
+
+    # Samples queue up in the STMPE610's FIFO, so they're drained every update
+    def sample_pending_fn():
+        return not touch_input.buffer_empty
+
+    return (touch_input, is_touched_fn, sample_pending_fn)
+
+TOUCH_DRIVERS = {
+    HARDWARE_REV2: init_tsc2004,
+    HARDWARE_REV1: init_stmpe610,
+}
+
+# Probed in this order when the hardware revision isn't known, or the saved one is wrong
+HARDWARE_PROBE_ORDER = (HARDWARE_REV2, HARDWARE_REV1)
+
+# Use the driver for the saved hardware revision, so only that driver is imported.
+# If that fails, probe for each controller in turn.
+def init_touch_input(hardware_revision):
+    if hardware_revision in TOUCH_DRIVERS:
+        try:
+            return (hardware_revision,) + TOUCH_DRIVERS[hardware_revision]()
+        except Exception as e:
+            print(f"Saved hardware revision {hardware_revision} not found:", e)
+
+    for revision in HARDWARE_PROBE_ORDER:
+        if revision == hardware_revision:
+            continue
+
+        try:
+            return (revision,) + TOUCH_DRIVERS[revision]()
+        except:
+            pass
+
+    raise Exception("Touch screen input device not found")
+
+hardware_revision, touch_input, is_touched_fn, sample_pending_fn = init_touch_input(loaded_prefs.hardware_revision)
+print("Hardware revision:", hardware_revision)
+
+# Remember the hardware revision for next time
+if hardware_revision != loaded_prefs.hardware_revision:
+    save_prefs(
+        activity_index=loaded_prefs.activity_index,
+        color_index=loaded_prefs.color_index,
+        brightness_index=loaded_prefs.brightness_index,
+        hardware_revision=hardware_revision
+    )
+
+# Touch sample filter. Median + IIR smoothing is steady, but lags behind fast movements.
+# For an adaptive filter that smooths slow movements and follows fast ones, try:
+# from filters import XYFilter, FilterChain, MedianFilter, OneEuroFilter
+# touch_filter = XYFilter(lambda: FilterChain(MedianFilter(), OneEuroFilter(rate=200)))
+from filters import XYSampleFilter
+touch_filter = XYSampleFilter(6, 10, integer=True)
 
 # Create touch screen handler
 from touch_screen import TouchScreen
@@ -224,9 +364,13 @@ touch_screen = TouchScreen(
     is_touched_fn=is_touched_fn,
     read_data_fn=touch_input.read_data,
     display_width=display.width, 
-    display_height=display.height
+    display_height=display.height,
+    sample_filter=touch_filter,
+    sample_pending_fn=sample_pending_fn
 )
 
+boot_timer.phase("touch")
+
 
 ##############################
 # Device
@@ -238,6 +382,7 @@ device = Device(
     keyboard=keyboard,
     touch_screen=touch_screen,
     neopixel=neopixel,
+    ble_hid=ble_hid,
     activity_index=loaded_prefs.activity_index,
     brightness_index=loaded_prefs.brightness_index
 )
@@ -246,12 +391,17 @@ device = Device(
 display_controller.root_group.remove(loading_label)
 loading_label = None
 
+boot_timer.phase("device")
+
 ##############################
 # Mode handling
 ##############################
 import gc
 from remote_mode import RemoteMode
 from preferences_mode import PreferencesMode
+from view_cache import ViewCache, VIEW_CACHE_BUDGET
+
+view_cache = ViewCache(root_group=display_controller.root_group, budget=VIEW_CACHE_BUDGET)
 
 current_mode = None
 
@@ -259,14 +409,21 @@ current_mode = None
 def set_mode(mode):
     global current_mode
 
+    # Switching modes may build a whole new UI, if its screen isn't in the view cache
+    device.profiler.expect_allocations()
+
     if current_mode is not None:
         current_mode.exit()
 
     current_mode = mode
 
+    # Don't let a miscounted key hold off idle garbage collection past a mode change
+    device.forget_held_keys()
+
     if mode is not None:
         mode.enter()
 
+    display_controller.invalidate()
     gc.collect()
     print(f"free memory: {gc.mem_free()}")
 
@@ -276,7 +433,7 @@ def on_goto_prefs():
 
 # Go to remote mode
 def goto_remote_mode():
-    remote_mode = RemoteMode(device=device, on_goto_prefs=on_goto_prefs)
+    remote_mode = RemoteMode(device=device, view_cache=view_cache, on_goto_prefs=on_goto_prefs)
     set_mode(remote_mode)
 
 # Callback for config mode; called when user makes activity selection
@@ -284,23 +441,203 @@ def on_activity_selected():
     save_prefs(
         activity_index=device.activity_index, 
         color_index=display_controller.color_index,
-        brightness_index=device.brightness_index
+        brightness_index=device.brightness_index,
+        hardware_revision=hardware_revision
     )
 
     goto_remote_mode()
 
 # Go to preferences mode
 def goto_prefs_mode():
-    config_mode = PreferencesMode(device=device, on_activity_selected=on_activity_selected)
+    config_mode = PreferencesMode(device=device, view_cache=view_cache, on_activity_selected=on_activity_selected)
     set_mode(config_mode)
 
 # Start in remote mode
 goto_remote_mode()
 
+boot_timer.phase("mode")
+
+##############################
+# Profiling
+##############################
+import function_key
+from profiler import ProfilerOverlay, STAGE_DEVICE, STAGE_DISPLAY, OVERLAY_REFRESH_INTERVAL
+
+profiler = device.profiler
+profiler_overlay = ProfilerOverlay(display_controller=display_controller, profiler=profiler)
+
+# Debugging aid: set to True to raise an error, naming the stage, as soon as a
+# steady state frame allocates (i.e. one without key events, touch samples,
+# or mode or connection changes). Turns the profiler on.
+ASSERT_NO_ALLOCATIONS = False
+
+if ASSERT_NO_ALLOCATIONS:
+    profiler.assert_no_allocations = True
+    profiler.enabled = True
+
+# Chords fire once their keys are held together for chord.CHORD_HOLD_DURATION.
+
+# Hold all four shoulder buttons to show or hide the profiler overlay
+device.add_chord(
+    (function_key.L1, function_key.L2, function_key.R1, function_key.R2),
+    profiler_overlay.toggle
+)
+
+# Hold L2, R1 and SELECT to start measuring key to HID report latency.
+# Hold them again to print the histogram, and append it to the SD card if there is one.
+LATENCY_LOG_FILE = 'sd/latency.txt'
+
+# Set to True to measure key latency from boot
+MEASURE_KEY_LATENCY = False
+
+device.key_latency.enabled = MEASURE_KEY_LATENCY
+
+def dump_key_latency():
+    if not device.key_latency.enabled:
+        print("Measuring key latency")
+        device.key_latency.enabled = True
+        return
+
+    device.key_latency.dump()
+
+    if sd_card_detected:
+        device.key_latency.save(LATENCY_LOG_FILE)
+
+device.add_chord(
+    (function_key.L2, function_key.R1, function_key.SELECT),
+    dump_key_latency
+)
+
+# Time a housekeeping task as part of the device stage
+def profiled_device_task(fn):
+    def task():
+        profiler.begin()
+        fn()
+        profiler.lap(STAGE_DEVICE)
+
+    return task
+
+##############################
+# Input recording
+##############################
+from input_recorder import InputRecorder
+
+# Recordings are numbered, so earlier ones aren't overwritten
+INPUT_TRACE_FILE = 'sd/trace-{}.bin'
+
+# How often to check whether the recording buffer should be written out (ms)
+INPUT_RECORDER_INTERVAL = 250
+
+input_recorder = None
+
+def next_input_trace_path():
+    number = 0
+
+    while True:
+        path = INPUT_TRACE_FILE.format(number)
+
+        try:
+            os.stat(path)
+        except OSError:
+            return path
+
+        number += 1
+
+# Hold L1, R2 and SELECT to start or stop recording key events and touch samples to the SD card
+def toggle_input_recording():
+    global input_recorder
+
+    if not sd_card_detected:
+        print("Input recording needs an SD card")
+        return
+
+    if input_recorder is None:
+        input_recorder = InputRecorder()
+
+    if input_recorder.recording:
+        device.input_recorder = None
+        input_recorder.stop()
+    elif input_recorder.start(next_input_trace_path()):
+        device.input_recorder = input_recorder
+
+device.add_chord(
+    (function_key.L1, function_key.R2, function_key.SELECT),
+    toggle_input_recording
+)
+
+# Write buffered records to the SD card outside of input frames
+def update_input_recorder():
+    if input_recorder is not None:
+        input_recorder.update()
+
+##############################
+# Scheduler
+##############################
+from scheduler import Scheduler, PRIORITY_INPUT, PRIORITY_NORMAL, PRIORITY_HOUSEKEEPING
+from device import BATTERY_UPDATE_INTERVAL
+from power import PowerManager
+from gc_policy import GCPolicy
+
+# Task periods, in milliseconds
+INPUT_POLL_INTERVAL = 1
+IDLE_CONTROLLER_INTERVAL = 100
+NEOPIXEL_INTERVAL = 50
+GC_POLICY_INTERVAL = 50
+
+# How often to check for UI changes to draw. The display controller also limits how often it refreshes.
+DISPLAY_UPDATE_INTERVAL = 10
+
+# Slows polling down while idle
+power_manager = PowerManager(device=device)
+
+scheduler = Scheduler(sleep_fn=power_manager.sleep)
+
+# Collects garbage in idle frames, so collection pauses don't land mid-gesture
+gc_policy = GCPolicy(device=device)
+
+# Input is polled as fast as possible. The BLE connection state is checked with it,
+# since the modes react to connection changes in the same frame.
+def update_input():
+    profiler.begin()
+    device.update_connection()
+    profiler.lap(STAGE_DEVICE)
+
+    current_mode.update()
+    power_manager.update()
+
+# Draw the frame's UI changes with one display refresh. While the touch screen is
+# being dragged, the refresh is put off, so SPI traffic doesn't slow down mouse movement.
+def update_display():
+    profiler.begin()
+    display_controller.update(defer=touch_screen.dragging)
+    profiler.lap(STAGE_DISPLAY)
+
+power_manager.add_task(scheduler.add(update_input, period=INPUT_POLL_INTERVAL, priority=PRIORITY_INPUT))
+power_manager.add_task(scheduler.add(profiled_device_task(device.update_idle_controller), period=IDLE_CONTROLLER_INTERVAL, priority=PRIORITY_NORMAL))
+power_manager.add_task(scheduler.add(profiled_device_task(device.update_ble_neopixel), period=NEOPIXEL_INTERVAL, priority=PRIORITY_HOUSEKEEPING))
+power_manager.add_task(scheduler.add(profiled_device_task(gc_policy.update), period=GC_POLICY_INTERVAL, priority=PRIORITY_HOUSEKEEPING))
+power_manager.add_task(scheduler.add(update_display, period=DISPLAY_UPDATE_INTERVAL, priority=PRIORITY_NORMAL))
+scheduler.add(profiled_device_task(device.update_battery), period=BATTERY_UPDATE_INTERVAL, priority=PRIORITY_HOUSEKEEPING)
+scheduler.add(profiler_overlay.update, period=OVERLAY_REFRESH_INTERVAL, priority=PRIORITY_HOUSEKEEPING)
+scheduler.add(update_input_recorder, period=INPUT_RECORDER_INTERVAL, priority=PRIORITY_HOUSEKEEPING)
+
+##############################
+# Boot log
+##############################
+from version import FIRMWARE_VERSION
+
+# One line per boot is appended here, so boots can be compared across firmware versions
+BOOT_LOG_FILE = 'sd/boot.txt'
+
+# Everything after the first mode enter: profiling, input recording and scheduler setup
+boot_timer.phase("tasks")
+boot_timer.dump()
+
+if sd_card_detected:
+    boot_timer.save(BOOT_LOG_FILE, FIRMWARE_VERSION)
+
 ##############################
 # Main loop
 ##############################
 def update():
-    device.update()
-    current_mode.update()
-    time.sleep(0.001)
+    scheduler.update()
@@ -0,0 +1,111 @@
+import time
+from adafruit_ticks import ticks_ms, ticks_add, ticks_diff
+
+##############################
+# Task priorities
+##############################
+# Due tasks run in priority order, lowest value first.
+PRIORITY_INPUT = 0
+PRIORITY_NORMAL = 1
+PRIORITY_HOUSEKEEPING = 2
+
+# Once a frame has spent this long (ms) running tasks, lower priority tasks
+# that are due wait for the next frame, so they can't delay input handling.
+DEFAULT_FRAME_BUDGET = 8
+
+# A due task is only made to wait this many frames in a row. After that it runs
+# even if the frame is over budget, so slow input frames can't starve it.
+DEFAULT_MAX_SKIPPED_FRAMES = 4
+
+# Longest the scheduler will sleep at once (ms)
+DEFAULT_MAX_SLEEP = 100
+
+def _sleep_ms(duration):
+    time.sleep(duration / 1000)
+
+##############################
+# Task class
+##############################
+class Task:
+    def __init__(self, fn, period, priority):
+        self.fn = fn
+        self.period = period
+        self.priority = priority
+        self.next_run = ticks_ms()
+
+        # Frames in a row this task was due but waited, because the frame was over budget
+        self.skipped_frames = 0
+
+##############################
+# Scheduler class
+##############################
+# A cooperative tick scheduler. Each subsystem registers an update function
+# with its own period, so input can be polled quickly while housekeeping
+# runs slowly, and the loop sleeps until the next task is due.
+class Scheduler:
+    # sleep_fn is called with the number of milliseconds to sleep between frames
+    def __init__(self, frame_budget=DEFAULT_FRAME_BUDGET, max_sleep=DEFAULT_MAX_SLEEP, sleep_fn=_sleep_ms, max_skipped_frames=DEFAULT_MAX_SKIPPED_FRAMES):
+        self._tasks = []
+        self._frame_budget = frame_budget
+        self._max_skipped_frames = max_skipped_frames
+        self._max_sleep = max_sleep
+        self._sleep_fn = sleep_fn
+
+    # Register fn to be called every 'period' milliseconds. Returns the Task,
+    # whose period can be changed later.
+    def add(self, fn, period, priority=PRIORITY_NORMAL):
+        task = Task(fn, period, priority)
+
+        # Keep tasks sorted by priority, in the order they were added within a priority.
+        index = len(self._tasks)
+
+        while index > 0 and self._tasks[index - 1].priority > priority:
+            index -= 1
+
+        self._tasks.insert(index, task)
+        return task
+
+    def remove(self, task):
+        self._tasks.remove(task)
+
+    # Run every task that's due, then sleep until the next one is.
+    def update(self):
+        start = ticks_ms()
+
+        for task in self._tasks:
+            now = ticks_ms()
+
+            if ticks_diff(now, task.next_run) < 0:
+                continue
+
+            # Lower priority tasks wait if higher priority ones used up the frame,
+            # unless they've already waited too many frames
+            if task.priority > PRIORITY_INPUT and ticks_diff(now, start) >= self._frame_budget:
+                if task.skipped_frames < self._max_skipped_frames:
+                    task.skipped_frames += 1
+                    continue
+
+            task.skipped_frames = 0
+            task.next_run = ticks_add(now, task.period)
+            task.fn()
+
+        self._sleep_until_next_task()
+
+    # Milliseconds until the next task is due
+    def time_until_next_task(self):
+        now = ticks_ms()
+        wait = self._max_sleep
+
+        for task in self._tasks:
+            until = ticks_diff(task.next_run, now)
+
+            if until < wait:
+                wait = until
+
+        return max(wait, 0)
+
+    def _sleep_until_next_task(self):
+        wait = self.time_until_next_task()
+
+        if wait > 0:
+            self._sleep_fn(wait)
@@ -1,3 +1,4 @@
+import gc
 import displayio
 from collections import namedtuple
 
@@ -6,22 +7,72 @@ from collections import namedtuple
 # that has been created from a sprite sheet.
 SpriteInstance = namedtuple("Sprite", ['group', 'tilegrid', 'bitmap'])
 
+# Heap to leave free after loading a sprite sheet into memory.
+# If loading it would leave less than this, the sheet is read from disk instead.
+IN_MEMORY_HEAP_RESERVE = 24 * 1024
+
+# Marks frames left out of an in-memory sheet loaded with only some frames
+_NO_TILE = 0xFF
+
+# Bytes used by a displayio.Bitmap. Rows are padded to 32 bits.
+def _bitmap_size(width, height, value_count):
+    bits = 1
+
+    while (1 << bits) < value_count:
+        bits *= 2
+
+    return (width * bits + 31) // 32 * 4 * height
+
 class SpriteSheet:
     SPRITE_WIDTH = 32
     SPRITE_HEIGHT = 32
 
-    def __init__(self, bitmap_path, palette=None):
+    # By default, the sheet stays on disk (OnDiskBitmap) and pixels are read from the file
+    # whenever a sprite is drawn. With in_memory, the sheet is loaded into a displayio.Bitmap,
+    # which draws faster and keeps the filesystem out of display refreshes. If 'frames' is given,
+    # only those frames are loaded. If there isn't enough memory, the sheet stays on disk.
+    def __init__(self, bitmap_path, palette=None, in_memory=False, frames=None):
         self._sprite_sheet = displayio.OnDiskBitmap(bitmap_path)
+        loaded_palette = self._sprite_sheet.pixel_shader
+
+        # Sheet frame -> tile in the in-memory sheet, if only some frames were loaded
+        self._tiles = None
+
+        if in_memory:
+            loaded = self._load(bitmap_path, frames)
+
+            if loaded is not None:
+                self._sprite_sheet, loaded_palette = loaded
 
         if palette:
             self._palette = palette
         else:
-            self._palette = self._sprite_sheet.pixel_shader
+            self._palette = loaded_palette
 
     @property
     def palette(self):
         return self._palette
 
+    @property
+    def in_memory(self):
+        return isinstance(self._sprite_sheet, displayio.Bitmap)
+
+    # The tile to show for a sheet frame
+    def tile_index(self, sprite_frame):
+        if self._tiles is None:
+            return sprite_frame
+
+        tile = self._tiles[sprite_frame]
+
+        if tile == _NO_TILE:
+            raise ValueError(f"Sprite frame {sprite_frame} isn't loaded")
+
+        return tile
+
+    # Change the frame shown by a sprite made by add_sprite()
+    def set_frame(self, sprite, sprite_frame):
+        sprite.tilegrid[0] = self.tile_index(sprite_frame)
+
     def add_sprite(self, to_group, sprite_frame, x=0, y=0, scale=1, palette=None):
         if palette is None:
             palette = self._palette
@@ -33,7 +84,7 @@ class SpriteSheet:
                                       tile_width = self.SPRITE_WIDTH, 
                                       tile_height = self.SPRITE_HEIGHT)
 
-        tilegrid[0] = sprite_frame
+        tilegrid[0] = self.tile_index(sprite_frame)
 
         sprite_group = displayio.Group()
         sprite_group.append(tilegrid)
@@ -49,3 +100,66 @@ class SpriteSheet:
             tilegrid=tilegrid, 
             bitmap=self._sprite_sheet
         )
+
+    # Load the sheet, or just 'frames' from it, into memory.
+    # Returns (bitmap, palette), or None if there isn't enough memory.
+    def _load(self, bitmap_path, frames):
+        import adafruit_imageload
+
+        on_disk = self._sprite_sheet
+        value_count = len(on_disk.pixel_shader)
+        needed = _bitmap_size(on_disk.width, on_disk.height, value_count)
+
+        if frames is not None:
+            frames = sorted(set(frames))
+            needed += _bitmap_size(len(frames) * self.SPRITE_WIDTH, self.SPRITE_HEIGHT, value_count)
+
+        gc.collect()
+
+        if gc.mem_free() - needed < IN_MEMORY_HEAP_RESERVE:
+            print("Not enough memory for the sprite sheet, reading it from disk")
+            return None
+
+        try:
+            bitmap, palette = adafruit_imageload.load(bitmap_path, bitmap=displayio.Bitmap, palette=displayio.Palette)
+
+            if frames is not None:
+                bitmap = self._pack_frames(bitmap, frames, value_count)
+        except MemoryError:
+            self._tiles = None
+            print("Not enough memory for the sprite sheet, reading it from disk")
+            return None
+
+        gc.collect()
+        return (bitmap, palette)
+
+    # Copy 'frames' out of the whole sheet, into one row of tiles
+    def _pack_frames(self, sheet, frames, value_count):
+        import bitmaptools
+
+        columns = sheet.width // self.SPRITE_WIDTH
+        packed = displayio.Bitmap(len(frames) * self.SPRITE_WIDTH, self.SPRITE_HEIGHT, value_count)
+        tiles = bytearray(columns * (sheet.height // self.SPRITE_HEIGHT))
+
+        for i in range(len(tiles)):
+            tiles[i] = _NO_TILE
+
+        for tile, frame in enumerate(frames):
+            x = (frame % columns) * self.SPRITE_WIDTH
+            y = (frame // columns) * self.SPRITE_HEIGHT
+
+            bitmaptools.blit(
+                packed,
+                sheet,
+                tile * self.SPRITE_WIDTH,
+                0,
+                x1=x,
+                y1=y,
+                x2=x + self.SPRITE_WIDTH,
+                y2=y + self.SPRITE_HEIGHT
+            )
+
+            tiles[frame] = tile
+
+        self._tiles = tiles
+        return packed
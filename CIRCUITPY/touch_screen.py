@@ -1,7 +1,20 @@
-from adafruit_simplemath import map_range
+from array import array
+from adafruit_ticks import ticks_ms, ticks_diff
 from filters import XYSampleFilter
+from input_recorder import RECORD_TOUCH_RAW, RECORD_TOUCH_FILTERED, RECORD_TOUCH_UP
 from user.config import CONFIG
 
+# Calibration coefficients are fixed point, with this many fractional bits
+CALIBRATION_BITS = 16
+
+# Most samples drained from a touch controller FIFO in one update,
+# so a stuck controller can't stall the main loop.
+MAX_SAMPLES_PER_UPDATE = 32
+
+# Longest time between samples passed to the filter (microseconds), so a pause
+# between touches or a slow frame doesn't read as the finger stopping dead
+MAX_SAMPLE_DT = 100 * 1000
+
 ##############################
 # Touch screen state
 ##############################
@@ -9,6 +22,40 @@ TOUCH_STATE_IDLE = 0
 TOUCH_STATE_START = 1
 TOUCH_STATE_PRESS = 2
 
+##############################
+# Calibration
+##############################
+# Convert min/max touch calibration into the equivalent affine transform, as an (a, b, c, d, e, f) tuple
+def affine_from_calibration(calibration, display_width, display_height):
+    scale_x = display_width / (calibration.max_x - calibration.min_x)
+    scale_y = display_height / (calibration.max_y - calibration.min_y)
+
+    # invert Y axis if necessary
+    if calibration.invert_y:
+        d_y = -scale_y
+        f_y = display_height + calibration.min_y * scale_y
+    else:
+        d_y = scale_y
+        f_y = -calibration.min_y * scale_y
+
+    return (
+        scale_x, 0.0, -calibration.min_x * scale_x,
+        0.0, d_y, f_y
+    )
+
+# The configured touch_affine, or the affine equivalent of touch_calibration if there isn't one.
+# touch_affine is optional, so configs written before it was added still work.
+def configured_affine(display_width, display_height):
+    affine = getattr(CONFIG, "touch_affine", None)
+
+    if affine is None:
+        affine = affine_from_calibration(CONFIG.touch_calibration, display_width, display_height)
+
+    return affine
+
+def _to_fixed(value):
+    return int(round(value * (1 << CALIBRATION_BITS)))
+
 ##############################
 # TouchScreen class
 ##############################
@@ -18,68 +65,244 @@ class TouchScreen:
         is_touched_fn,
         read_data_fn,
         display_width, 
-        display_height
+        display_height,
+        sample_filter=None,
+        sample_pending_fn=None
     ):
         self._is_touched_fn = is_touched_fn
         self._read_data_fn = read_data_fn
+
+        # For controllers with a sample FIFO, returns True while samples are waiting in it.
+        self._sample_pending_fn = sample_pending_fn
         self._display_width = display_width
         self._display_height = display_height
-        self._filter = XYSampleFilter(6, 10)
+
+        # Compile the calibration into fixed point coefficients once,
+        # so mapping a sample is pure integer math.
+        a, b, c, d, e, f = configured_affine(display_width, display_height)
+
+        half = 1 << (CALIBRATION_BITS - 1)
+        self._a = _to_fixed(a)
+        self._b = _to_fixed(b)
+        self._c = _to_fixed(c) + half
+        self._d = _to_fixed(d)
+        self._e = _to_fixed(e)
+        self._f = _to_fixed(f) + half
+
+        # Plain min/max calibration doesn't mix the axes, so the cross terms can be skipped
+        self._is_separable = self._b == 0 and self._d == 0
+
+        # Any filter from filters.py with an update(x, y, reset) method and x/y results
+        if sample_filter is None:
+            sample_filter = XYSampleFilter(6, 10, integer=True)
+
+        self._filter = sample_filter
         self._touch_state = TOUCH_STATE_IDLE
 
-        self._last_sample = None
-        self._touch_delta = (0, 0)
+        # Newest filtered position, and movement since it was last reported
+        self._last_x = 0
+        self._last_y = 0
+        self._delta_x = 0
+        self._delta_y = 0
+
+        # Movement reported by the last update. Kept as ints rather than
+        # tuples so that update() doesn't allocate.
+        self._touch_delta_x = 0
+        self._touch_delta_y = 0
+
+        # Set once the current touch has moved
+        self._has_moved = False
+
+        # Optional InputRecorder for raw and filtered samples
+        self._recorder = None
+
+        # Optional Profiler, told that frames which read samples allocate
+        self._profiler = None
+
+        # Raw samples drained from a FIFO in one update, held so they can be spread over the time since the last update
+        self._fifo_x = array('H', [0] * MAX_SAMPLES_PER_UPDATE)
+        self._fifo_y = array('H', [0] * MAX_SAMPLES_PER_UPDATE)
+
+        # When samples were last read, or None if not during this touch
+        self._last_read_time = None
+
+    @property
+    def recorder(self):
+        return self._recorder
+
+    @recorder.setter
+    def recorder(self, recorder):
+        self._recorder = recorder
+
+    @property
+    def profiler(self):
+        return self._profiler
+
+    @profiler.setter
+    def profiler(self, profiler):
+        self._profiler = profiler
 
     @property
     def touched(self):
         return self._touch_state == TOUCH_STATE_PRESS
 
+    # True from the very first sample of a touch, before touched is, since that sample is thrown away
+    @property
+    def in_contact(self):
+        return self._touch_state != TOUCH_STATE_IDLE
+
     @property
     def touch_moved(self):
-        return self._touch_delta != (0, 0)
+        return self._touch_delta_x != 0 or self._touch_delta_y != 0
+
+    # True while touched, once the touch has moved
+    @property
+    def dragging(self):
+        return self._has_moved and self._touch_state == TOUCH_STATE_PRESS
+
+    @property
+    def touch_delta_x(self):
+        return self._touch_delta_x
+
+    @property
+    def touch_delta_y(self):
+        return self._touch_delta_y
 
+    # Movement since the last update, as an (x, y) tuple. Allocates; prefer touch_delta_x/y in the main loop.
     @property 
     def touch_delta(self):
-        return self._touch_delta
+        return (self._touch_delta_x, self._touch_delta_y)
 
+    # Current position. Only valid while touched.
+    @property
+    def touch_x(self):
+        return self._last_x
+
+    @property
+    def touch_y(self):
+        return self._last_y
+
+    # Current position as an (x, y) tuple, or None if not touched. Allocates; prefer touch_x/y in the main loop.
     @property
     def touch_point(self):
-        return self._last_sample
+        if self._touch_state != TOUCH_STATE_PRESS:
+            return None
+
+        return (self._last_x, self._last_y)
 
     def update(self):
-        self._touch_delta = (0, 0)
+        self._touch_delta_x = 0
+        self._touch_delta_y = 0
 
         if self._is_touched_fn():
-            y_sample, x_sample, _ = self._read_data_fn()
+            self._expect_allocations()
 
-            x_sample = map_range(x_sample, CONFIG.touch_calibration.min_x, CONFIG.touch_calibration.max_x, 0, self._display_width)
+            # Without a FIFO, there's just the current sample.
+            if self._sample_pending_fn is None:
+                y_sample, x_sample, _ = self._read_data_fn()
+                self._process_sample(x_sample, y_sample, self._time_since_read())
 
-            # invert Y axis if necessary
-            if CONFIG.touch_calibration.invert_y:
-                y_sample = map_range(y_sample, CONFIG.touch_calibration.min_y, CONFIG.touch_calibration.max_y, self._display_height, 0)
+            # Otherwise drain every pending sample, so the position doesn't
+            # fall behind the finger when a frame takes longer than usual.
+            # The controller samples at a steady rate, so the samples are
+            # taken to be evenly spread over the time since the last update.
             else:
-                y_sample = map_range(y_sample, CONFIG.touch_calibration.min_y, CONFIG.touch_calibration.max_y, 0, self._display_height)
+                sample_count = 0
 
-            # The very first reading can be very erratic, so throw it away.
-            if self._touch_state == TOUCH_STATE_IDLE:
-                self._touch_state = TOUCH_STATE_START
-                self._last_sample = None
+                while sample_count < MAX_SAMPLES_PER_UPDATE and self._sample_pending_fn():
+                    y_sample, x_sample, _ = self._read_data_fn()
+                    self._fifo_x[sample_count] = x_sample
+                    self._fifo_y[sample_count] = y_sample
+                    sample_count += 1
 
-            # Now we'll start reading samples. Reset the filter and get the first one.
-            elif self._touch_state == TOUCH_STATE_START:
-                self._touch_state = TOUCH_STATE_PRESS
-                self._last_sample = self._filter(x_sample, y_sample, reset=True)
+                if sample_count > 0:
+                    dt = self._time_since_read() // sample_count
 
-            # Continue reading and filtering samples until the screen isn't touched anymore.
-            elif self._touch_state == TOUCH_STATE_PRESS:
-                x_filtered, y_filtered = self._filter(x_sample, y_sample, reset=False)
-                x_last, y_last = self._last_sample
+                    for i in range(sample_count):
+                        self._process_sample(self._fifo_x[i], self._fifo_y[i], dt)
 
-                x_diff = int(x_filtered - x_last)
-                y_diff = int(y_filtered - y_last)
+            # Report the total movement since the last update
+            if self._touch_state == TOUCH_STATE_PRESS:
+                self._touch_delta_x = self._delta_x
+                self._touch_delta_y = self._delta_y
+                self._delta_x = 0
+                self._delta_y = 0
 
-                self._last_sample = (x_filtered, y_filtered)
-                self._touch_delta = (x_diff, y_diff)
+                if self._touch_delta_x != 0 or self._touch_delta_y != 0:
+                    self._has_moved = True
         else:
+            if self._recorder is not None and self._touch_state != TOUCH_STATE_IDLE:
+                self._recorder.record(RECORD_TOUCH_UP, 0, 0, 0)
+
             self._touch_state = TOUCH_STATE_IDLE
-            self._last_sample = None
+            self._has_moved = False
+            self._last_read_time = None
+
+            # Throw away anything left in the FIFO, so it isn't mistaken for the next touch
+            if self._sample_pending_fn is not None:
+                sample_count = 0
+
+                while sample_count < MAX_SAMPLES_PER_UPDATE and self._sample_pending_fn():
+                    self._expect_allocations()
+                    self._read_data_fn()
+                    sample_count += 1
+
+    # The touch drivers return a new tuple for every sample they read
+    def _expect_allocations(self):
+        if self._profiler is not None:
+            self._profiler.expect_allocations()
+
+    # Microseconds since samples were last read, up to MAX_SAMPLE_DT, or 0 at the start of a touch
+    def _time_since_read(self):
+        now = ticks_ms()
+        last_read_time = self._last_read_time
+        self._last_read_time = now
+
+        if last_read_time is None:
+            return 0
+
+        return min(max(ticks_diff(now, last_read_time), 0) * 1000, MAX_SAMPLE_DT)
+
+    # Calibrate and filter one raw sample. 'dt' is the time since the previous sample, in microseconds.
+    def _process_sample(self, x_sample, y_sample, dt):
+        if self._recorder is not None:
+            self._recorder.record(RECORD_TOUCH_RAW, 0, x_sample, y_sample)
+
+        if self._is_separable:
+            x_display = (self._a * x_sample + self._c) >> CALIBRATION_BITS
+            y_display = (self._e * y_sample + self._f) >> CALIBRATION_BITS
+        else:
+            x_display = (self._a * x_sample + self._b * y_sample + self._c) >> CALIBRATION_BITS
+            y_display = (self._d * x_sample + self._e * y_sample + self._f) >> CALIBRATION_BITS
+
+        # Keep the sample on the display
+        x_sample = min(max(x_display, 0), self._display_width)
+        y_sample = min(max(y_display, 0), self._display_height)
+
+        # The very first reading can be very erratic, so throw it away.
+        if self._touch_state == TOUCH_STATE_IDLE:
+            self._touch_state = TOUCH_STATE_START
+
+        # Now we'll start reading samples. Reset the filter and get the first one.
+        elif self._touch_state == TOUCH_STATE_START:
+            self._touch_state = TOUCH_STATE_PRESS
+            self._filter.update(x_sample, y_sample, reset=True)
+            self._last_x = self._filter.x
+            self._last_y = self._filter.y
+            self._delta_x = 0
+            self._delta_y = 0
+
+        # Continue reading and filtering samples until the screen isn't touched anymore.
+        elif self._touch_state == TOUCH_STATE_PRESS:
+            self._filter.update(x_sample, y_sample, reset=False, dt=dt)
+            x_filtered = self._filter.x
+            y_filtered = self._filter.y
+
+            self._delta_x += x_filtered - self._last_x
+            self._delta_y += y_filtered - self._last_y
+
+            self._last_x = x_filtered
+            self._last_y = y_filtered
+
+        if self._recorder is not None and self._touch_state == TOUCH_STATE_PRESS:
+            self._recorder.record(RECORD_TOUCH_FILTERED, 0, int(self._last_x), int(self._last_y))
@@ -7,6 +7,20 @@ def make_palette(color):
     p[1] = color
     return p
 
+# Palettes made by get_palette(), by foreground color
+_palette_cache = {}
+
+# Like make_palette(), but returns the same palette every time it's asked for the same color.
+# The palette is shared, so don't change its colors; use make_palette() for a palette you want to change.
+def get_palette(color):
+    p = _palette_cache.get(color)
+
+    if p is None:
+        p = make_palette(color)
+        _palette_cache[color] = p
+
+    return p
+
 # Do not remove these. They may be referenced by name elsewhere.
 # Feel free to change the actual color value, however.
 WHITE = 0xFFFFFF
@@ -9,13 +9,20 @@ TouchCalibration = namedtuple("TouchCalibration", [
 	"invert_y"]
 )
 
+# Optional full affine touch calibration, for rotated or skewed panels. Configs
+# without a touch_affine field use touch_calibration. Maps raw touch readings to display coordinates:
+#   display_x = a * raw_x + b * raw_y + c
+#   display_y = d * raw_x + e * raw_y + f
+TouchAffine = namedtuple("TouchAffine", ["a", "b", "c", "d", "e", "f"])
+
 # Device config settings
 DeviceConfig = namedtuple("DeviceConfig", [
 	"ble_name", 
 	"neopixel_color", 
 	"neopixel_max_brightness", 
 	"low_voltage_warning", 
-	"touch_calibration"]
+	"touch_calibration",
+	"touch_affine"]
 )
 
 # Feel free to edit these seetings as needed/desired.
@@ -31,5 +38,8 @@ CONFIG = DeviceConfig(
     	min_y=250,
     	max_y=3700,    
     	invert_y=True		
-	)
+	),
+
+	# Set to a TouchAffine to use it instead of touch_calibration
+	touch_affine=None
 )
\ No newline at end of file
@@ -0,0 +1,2 @@
+# Reported as the BLE device info software revision, and in the boot log
+FIRMWARE_VERSION = "1.1.0"
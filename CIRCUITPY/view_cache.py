@@ -0,0 +1,130 @@
+import gc
+import displayio
+
+# Bytes of heap the cached views may use between them, so switching back to a screen doesn't rebuild it
+VIEW_CACHE_BUDGET = 32 * 1024
+
+class _CachedView:
+    def __init__(self, group, parts, size, color_index):
+        self.group = group
+        self.parts = parts
+        self.size = size
+        self.color_index = color_index
+
+##############################
+# ViewCache class
+##############################
+# Keeps the display groups built for each screen (e.g. each activity's remote
+# screen, and the preferences screen) in the root group after the screen is left,
+# hidden, so going back to a screen only has to unhide it. Screens are built the
+# first time they're shown. The least recently shown screens are dropped to keep
+# the cache within its memory budget. The screen being shown is never dropped,
+# even if it doesn't fit by itself.
+#
+# Views are built in one UI color. Showing a view with a different color index
+# recolors it with recolor_fn(parts) if one is given, or rebuilds it if not.
+class ViewCache:
+    def __init__(self, root_group, budget=VIEW_CACHE_BUDGET):
+        self._root_group = root_group
+        self._budget = budget
+        self._views = {}
+
+        # Least recently shown first
+        self._keys = []
+        self._shown_key = None
+        self._size = 0
+
+    # Total bytes used by the cached views
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def count(self):
+        return len(self._keys)
+
+    # Show the view for 'key', hiding the one shown before it. If it isn't cached,
+    # or was built in another color and can't be recolored, build_fn(group) is called
+    # to fill a new group with the view. Returns what build_fn returned (e.g. the labels and sprites to update later).
+    def show(self, key, build_fn, color_index, recolor_fn=None):
+        self.hide()
+
+        view = self._views.get(key)
+
+        if view is not None and view.color_index != color_index:
+            if recolor_fn is None:
+                self.evict(key)
+                view = None
+            else:
+                recolor_fn(view.parts)
+                view.color_index = color_index
+
+        if view is None:
+            view = self._build(build_fn, color_index)
+            self._views[key] = view
+        else:
+            self._keys.remove(key)
+
+        self._keys.append(key)
+        self._shown_key = key
+        view.group.hidden = False
+
+        self._evict_to_budget()
+        return view.parts
+
+    # Hide the view being shown, keeping it cached
+    def hide(self):
+        if self._shown_key is not None:
+            self._views[self._shown_key].group.hidden = True
+            self._shown_key = None
+
+    # The view for 'key' was recolored in place, so it doesn't need rebuilding for this color
+    def recolored(self, key, color_index):
+        view = self._views.get(key)
+
+        if view is not None:
+            view.color_index = color_index
+
+    # Drop the view for 'key' from the cache and the display
+    def evict(self, key):
+        view = self._views.pop(key, None)
+
+        if view is None:
+            return
+
+        if key == self._shown_key:
+            self._shown_key = None
+
+        self._keys.remove(key)
+        self._root_group.remove(view.group)
+        self._size -= view.size
+
+    def clear(self):
+        for key in list(self._keys):
+            self.evict(key)
+
+    def _build(self, build_fn, color_index):
+        gc.collect()
+        alloc_before = gc.mem_alloc()
+
+        group = displayio.Group()
+        group.hidden = True
+        parts = build_fn(group)
+        self._root_group.append(group)
+
+        gc.collect()
+        size = max(0, gc.mem_alloc() - alloc_before)
+        self._size += size
+
+        return _CachedView(group, parts, size, color_index)
+
+    def _evict_to_budget(self):
+        index = 0
+
+        while self._size > self._budget and index < len(self._keys):
+            key = self._keys[index]
+
+            if key == self._shown_key:
+                index += 1
+            else:
+                self.evict(key)
@@ -0,0 +1,186 @@
+############################################################
+# Touch filter microbenchmark
+#
+# Compares samples/sec and allocations of the filters in
+# CIRCUITPY/filters.py against the original list-based
+# median filter they replaced.
+#
+# Runs on the host, under CPython:
+#     python3 tools/bench_filters.py
+#
+# where allocations are measured with tracemalloc. CPython
+# allocates every int over 256, so the integer filters show
+# allocations there that they don't make on the device, and
+# it reuses floats from a free list, which tracemalloc doesn't
+# see. Or run it under the MicroPython unix port, which reports
+# exact heap allocations from gc.mem_alloc() like the device:
+#     micropython tools/bench_filters.py
+############################################################
+import sys
+import gc
+import time
+
+try:
+    import os
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "CIRCUITPY"))
+except (ImportError, AttributeError):
+    sys.path.insert(0, "CIRCUITPY")
+
+import filters
+
+SAMPLE_COUNT = 20000
+
+##############################
+# Original filters, for comparison
+##############################
+def _legacy_cmp_swap(arr, i, j):
+    if arr[i] > arr[j]:
+        arr[i], arr[j] = arr[j], arr[i]
+
+class LegacyMedianFilter:
+    def __init__(self):
+        self._samples = [0] * 5
+
+    def __call__(self, x, reset):
+        if reset:
+            self._samples = [x] * 5
+            return x
+        else:
+            self._samples.pop(0)
+            self._samples.append(x)
+
+            sorted_samples = self._samples[:]
+            _legacy_cmp_swap(sorted_samples, 0, 1)
+            _legacy_cmp_swap(sorted_samples, 2, 3)
+            _legacy_cmp_swap(sorted_samples, 0, 2)
+            _legacy_cmp_swap(sorted_samples, 1, 4)
+            _legacy_cmp_swap(sorted_samples, 0, 1)
+            _legacy_cmp_swap(sorted_samples, 2, 3)
+            _legacy_cmp_swap(sorted_samples, 1, 2)
+            _legacy_cmp_swap(sorted_samples, 3, 4)
+            _legacy_cmp_swap(sorted_samples, 2, 3)
+
+        return sorted_samples[2]
+
+class LegacyChannelFilter:
+    def __init__(self, N, D):
+        self._median_filter = LegacyMedianFilter()
+        self._iir_filter = filters.IIRFilter(N, D)
+
+    def __call__(self, x, reset=False):
+        return self._iir_filter(self._median_filter(x, reset), reset)
+
+class LegacyXYSampleFilter:
+    def __init__(self, N, D):
+        self._x_filter = LegacyChannelFilter(N, D)
+        self._y_filter = LegacyChannelFilter(N, D)
+
+    def __call__(self, x, y, reset=False):
+        return (self._x_filter(x, reset), self._y_filter(y, reset))
+
+##############################
+# Measurement
+##############################
+def _make_samples(count, as_float):
+    # Deterministic, noisy diagonal drag across a 320x240 screen
+    samples = []
+    seed = 12345
+
+    for i in range(count):
+        seed = (seed * 1103515245 + 12345) & 0x7FFFFFFF
+        noise_x = (seed >> 8) % 7 - 3
+        noise_y = (seed >> 16) % 7 - 3
+        x = (i * 320 // count) + noise_x
+        y = (i * 240 // count) + noise_y
+
+        if as_float:
+            samples.append((x + 0.25, y + 0.75))
+        else:
+            samples.append((x, y))
+
+    return samples
+
+def _ticks_us():
+    if hasattr(time, "ticks_us"):
+        return time.ticks_us()
+
+    return time.perf_counter_ns() // 1000
+
+def _elapsed_us(start, end):
+    if hasattr(time, "ticks_diff"):
+        return time.ticks_diff(end, start)
+
+    return end - start
+
+# Samples averaged over when measuring allocations with tracemalloc
+TRACEMALLOC_SAMPLE_COUNT = 1000
+
+# Returns heap bytes allocated by fn. MicroPython reports this the way the device would.
+# On CPython, it's the mean of tracemalloc's peak over many calls, as in bench_replay.py.
+def _allocated_bytes(fn):
+    if hasattr(gc, "mem_alloc"):
+        gc.collect()
+        gc.disable()
+        before = gc.mem_alloc()
+        fn()
+        after = gc.mem_alloc()
+        gc.enable()
+        return after - before
+
+    import tracemalloc
+
+    total = 0
+    tracemalloc.start()
+
+    for _ in range(TRACEMALLOC_SAMPLE_COUNT):
+        tracemalloc.reset_peak()
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        fn()
+        total += tracemalloc.get_traced_memory()[1] - start_bytes
+
+    tracemalloc.stop()
+    return total / TRACEMALLOC_SAMPLE_COUNT
+
+def bench(name, make_filter, samples, call):
+    f = make_filter()
+    first_x, first_y = samples[0]
+    call(f, first_x, first_y, True)
+
+    start = _ticks_us()
+
+    for x, y in samples:
+        call(f, x, y, False)
+
+    elapsed = _elapsed_us(start, _ticks_us())
+
+    # Allocation for a single steady state sample
+    x, y = samples[len(samples) // 2]
+    per_sample = _allocated_bytes(lambda: call(f, x, y, False))
+
+    rate = len(samples) * 1000000 // max(elapsed, 1)
+
+    print(f"{name:<36} {rate:>10} samples/s {per_sample:>8.1f} bytes/sample")
+
+def _call_tuple(f, x, y, reset):
+    return f(x, y, reset)
+
+def _call_update(f, x, y, reset):
+    f.update(x, y, reset)
+
+def main():
+    float_samples = _make_samples(SAMPLE_COUNT, as_float=True)
+    int_samples = _make_samples(SAMPLE_COUNT, as_float=False)
+
+    print(f"{SAMPLE_COUNT} samples per run")
+
+    if not hasattr(gc, "mem_alloc"):
+        print("Allocations measured with tracemalloc. CPython boxes ints over 256 and reuses floats,")
+        print("so these aren't the device's numbers; run under MicroPython for those.")
+
+    bench("legacy XYSampleFilter (float)", lambda: LegacyXYSampleFilter(6, 10), float_samples, _call_tuple)
+    bench("legacy XYSampleFilter (int)", lambda: LegacyXYSampleFilter(6, 10), int_samples, _call_tuple)
+    bench("XYSampleFilter (float)", lambda: filters.XYSampleFilter(6, 10), float_samples, _call_tuple)
+    bench("XYSampleFilter.update (float)", lambda: filters.XYSampleFilter(6, 10), float_samples, _call_update)
+    bench("XYSampleFilter.update (integer)", lambda: filters.XYSampleFilter(6, 10, integer=True), int_samples, _call_update)
+
+main()
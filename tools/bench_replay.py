@@ -0,0 +1,228 @@
+############################################################
+# Input trace replay benchmark
+#
+# Boots the firmware under the hardware simulator and plays
+# input traces (key events and touch samples) through the
+# main loop's input frame, i.e. RemoteMode.update() or
+# PreferencesMode.update(), one frame per --frame-interval
+# of simulated time. For each trace it reports:
+#
+#   - frames/sec and frame time percentiles, measured on
+#     the host (compare runs on the same machine only)
+#   - allocations per frame: the peak heap growth within a
+#     frame, measured with tracemalloc in a second, identical
+#     run. CPython frees most objects as soon as they're
+#     unused, so this is a lower bound on what MicroPython
+#     allocates (and eventually has to collect) per frame.
+#   - HID reports sent, per HID device
+#
+# The simulated clock makes every run of a trace identical,
+# so numbers from before and after a change are comparable:
+#
+#     python3 tools/bench_replay.py --save before.json
+#     ...change something...
+#     python3 tools/bench_replay.py --compare before.json
+#
+# Traces recorded on the device (see input_recorder.py) can be
+# given by path, e.g. tools/bench_replay.py sd/trace-0.bin
+############################################################
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sim import Simulator
+from sim.trace import TracePlayer, MODE_PREFS, load_recording
+from sim.traces import SYNTHETIC
+
+# Simulated time per frame (ms), roughly how long a frame takes on the device
+DEFAULT_FRAME_INTERVAL = 5
+
+# Keep running frames this long after the last event, so the trace's effects settle (ms)
+SETTLE_DURATION = 200
+
+def _percentile(sorted_values, percent):
+    return sorted_values[min(len(sorted_values) - 1, (len(sorted_values) * percent) // 100)]
+
+# Boot the firmware and play one trace. Returns (trace, frame times in ns, per-frame allocated bytes, simulator).
+def _play(make_trace, frame_interval, trace_allocations):
+    simulator = Simulator(echo=False, keep_hid_reports=False)
+
+    with simulator:
+        run = simulator.boot()
+        trace = make_trace()
+
+        with simulator.serial_output():
+            if trace.start_mode == MODE_PREFS:
+                run.goto_prefs_mode()
+
+            simulator.clear_hid_reports()
+            player = TracePlayer(trace, simulator)
+            end_ms = simulator.clock.ticks_ms() + trace.duration + SETTLE_DURATION
+
+            frame_times = []
+            allocations = []
+            gc.collect()
+
+            if trace_allocations:
+                tracemalloc.start()
+
+            while simulator.clock.ticks_ms() < end_ms:
+                player.update()
+
+                if trace_allocations:
+                    tracemalloc.reset_peak()
+                    start_bytes = tracemalloc.get_traced_memory()[0]
+
+                start = time.perf_counter_ns()
+                run.update_input()
+                frame_times.append(time.perf_counter_ns() - start)
+
+                if trace_allocations:
+                    allocations.append(tracemalloc.get_traced_memory()[1] - start_bytes)
+
+                simulator.clock.advance_ms(frame_interval)
+
+            if trace_allocations:
+                tracemalloc.stop()
+
+        return (trace, frame_times, allocations, simulator)
+
+def run_benchmark(name, make_trace, frame_interval):
+    trace, frame_times, _, simulator = _play(make_trace, frame_interval, trace_allocations=False)
+    _, _, allocations, _ = _play(make_trace, frame_interval, trace_allocations=True)
+
+    frame_count = len(frame_times)
+    sorted_times = sorted(frame_times)
+    hid_reports = dict(simulator.hid_report_counts)
+
+    return {
+        "trace": name,
+        "mode": trace.start_mode,
+        "events": len(trace.events),
+        "frames": frame_count,
+        "fps": frame_count / (sum(frame_times) / 1e9),
+        "p50_us": _percentile(sorted_times, 50) / 1000,
+        "p90_us": _percentile(sorted_times, 90) / 1000,
+        "p99_us": _percentile(sorted_times, 99) / 1000,
+        "max_us": sorted_times[-1] / 1000,
+        "alloc_mean_bytes": sum(allocations) / frame_count,
+        "alloc_max_bytes": max(allocations),
+        "hid_reports": sum(hid_reports.values()),
+        "hid_reports_by_device": hid_reports,
+    }
+
+##############################
+# Output
+##############################
+COLUMNS = (
+    ("trace", "trace", "{:<22}"),
+    ("mode", "mode", "{:<7}"),
+    ("frames", "frames", "{:>7}"),
+    ("fps", "fps", "{:>9.0f}"),
+    ("p50_us", "p50 us", "{:>8.1f}"),
+    ("p90_us", "p90 us", "{:>8.1f}"),
+    ("p99_us", "p99 us", "{:>8.1f}"),
+    ("max_us", "max us", "{:>9.1f}"),
+    ("alloc_mean_bytes", "alloc B/f", "{:>10.1f}"),
+    ("alloc_max_bytes", "alloc max", "{:>10}"),
+    ("hid_reports", "HID", "{:>6}"),
+)
+
+# Metrics compared against a baseline, and whether bigger is better
+COMPARED = (
+    ("fps", True),
+    ("p50_us", False),
+    ("p99_us", False),
+    ("alloc_mean_bytes", False),
+    ("hid_reports", False),
+)
+
+def _header():
+    widths = [len(fmt.format(0 if key not in ("trace", "mode") else "")) for key, _, fmt in COLUMNS]
+    return " ".join(f"{title:>{width}}" if i > 1 else f"{title:<{width}}" for i, ((_, title, _), width) in enumerate(zip(COLUMNS, widths)))
+
+def print_results(results):
+    print(_header())
+
+    for result in results:
+        print(" ".join(fmt.format(result[key]) for key, _, fmt in COLUMNS))
+
+    print()
+    print("HID reports by device:")
+
+    for result in results:
+        by_device = ", ".join(f"{device} {count}" for device, count in sorted(result["hid_reports_by_device"].items()))
+        print(f"  {result['trace']:<22} {by_device or '-'}")
+
+def print_comparison(results, baseline):
+    baseline_by_trace = {result["trace"]: result for result in baseline}
+
+    print()
+    print("Change from baseline:")
+
+    for result in results:
+        before = baseline_by_trace.get(result["trace"])
+
+        if before is None:
+            print(f"  {result['trace']:<22} not in baseline")
+            continue
+
+        changes = []
+
+        for key, bigger_is_better in COMPARED:
+            old = before[key]
+            new = result[key]
+
+            if old == new:
+                changes.append(f"{key} =")
+            elif old == 0:
+                changes.append(f"{key} {old} -> {new}")
+            else:
+                percent = (new - old) * 100 / old
+                better = (percent > 0) == bigger_is_better
+                changes.append(f"{key} {percent:+.1f}%{'' if better else ' (worse)'}")
+
+        print(f"  {result['trace']:<22} {', '.join(changes)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay input traces through the firmware and report frame timings")
+    parser.add_argument("traces", nargs="*", help=f"traces to run, or paths to recorded traces (default: all of {', '.join(SYNTHETIC)})")
+    parser.add_argument("--frame-interval", type=int, default=DEFAULT_FRAME_INTERVAL, help="simulated ms per frame")
+    parser.add_argument("--save", metavar="FILE", help="save the results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare against results saved with --save")
+    args = parser.parse_args()
+
+    names = args.traces or list(SYNTHETIC)
+    results = []
+
+    for name in names:
+        if name in SYNTHETIC:
+            make_trace = SYNTHETIC[name]
+        elif os.path.isfile(name):
+            path = os.path.abspath(name)
+            make_trace = lambda path=path: load_recording(path)
+        else:
+            parser.error(f"unknown trace '{name}'")
+
+        results.append(run_benchmark(name, make_trace, args.frame_interval))
+
+    print_results(results)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+        print(f"\nSaved {args.save}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+############################################################
+# Palettized BMP reading and writing, for the host tools.
+# Used by the sprite packer and the simulator's displayio
+# and adafruit_imageload fakes. Standard library only.
+############################################################
+import struct
+
+# Reads an uncompressed 1, 4 or 8 bit palettized BMP.
+# Returns (width, height, palette colors, rows of palette indices, top row first).
+def read_bmp(path):
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if data[:2] != b"BM":
+        raise ValueError(f"{path} is not a BMP file")
+
+    pixel_offset = struct.unpack_from("<I", data, 10)[0]
+    header_size, width, height, _, bits, compression, _, _, _, color_count = struct.unpack_from("<IiiHHIIiiI", data, 14)
+
+    if bits not in (1, 4, 8) or compression != 0:
+        raise ValueError(f"{path}: only uncompressed 1, 4 and 8 bit BMPs are supported")
+
+    if color_count == 0:
+        color_count = 1 << bits
+
+    palette_offset = 14 + header_size
+    colors = []
+
+    for i in range(color_count):
+        b, g, r, _ = data[palette_offset + i * 4:palette_offset + i * 4 + 4]
+        colors.append((r << 16) | (g << 8) | b)
+
+    bottom_up = height > 0
+    height = abs(height)
+    stride = ((width * bits + 31) // 32) * 4
+    mask = (1 << bits) - 1
+    rows = []
+
+    for row in range(height):
+        start = pixel_offset + row * stride
+        line = data[start:start + stride]
+        pixels = bytearray(width)
+
+        for x in range(width):
+            bit = x * bits
+            pixels[x] = (line[bit >> 3] >> (8 - bits - (bit & 7))) & mask
+
+        rows.append(pixels)
+
+    if bottom_up:
+        rows.reverse()
+
+    return (width, height, colors, rows)
+
+# Write an uncompressed 1-bit BMP, bottom row first, like most BMPs
+def write_bmp(path, colors, rows):
+    height = len(rows)
+    width = len(rows[0])
+    stride = (width + 31) // 32 * 4
+    palette = b"".join(struct.pack("<BBBx", color & 0xFF, (color >> 8) & 0xFF, color >> 16) for color in colors)
+    pixel_offset = 14 + 40 + len(palette)
+
+    pixels = bytearray()
+
+    for row in reversed(rows):
+        line = bytearray(stride)
+
+        for x, value in enumerate(row):
+            if value:
+                line[x >> 3] |= 0x80 >> (x & 7)
+
+        pixels += line
+
+    with open(path, "wb") as f:
+        f.write(struct.pack("<2sIHHI", b"BM", pixel_offset + len(pixels), 0, 0, pixel_offset))
+        f.write(struct.pack("<IiiHHIIiiII", 40, width, height, 1, 1, 0, len(pixels), 2835, 2835, len(colors), 0))
+        f.write(palette)
+        f.write(pixels)
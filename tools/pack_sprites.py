@@ -0,0 +1,362 @@
+############################################################
+# Sprite atlas packer
+#
+# Works out which sprites the firmware actually uses, and
+# packs just those tiles into a new 1-bit atlas, with a
+# matching sprites.py:
+#
+#   - every sprites.py constant used in user/activities.py,
+#     or used as sprites.NAME anywhere in the firmware
+#   - anything named with --keep
+#   - tiles added from the Kenney 1-bit input prompts set
+#     with --add NAME=COLUMN,ROW (16x16 tiles, doubled to
+#     32x32; the column and row are the tile's position in
+#     the Kenney tilemap)
+#
+#     python3 tools/pack_sprites.py --out-dir build/sprites
+#
+# Copy the two files from --out-dir to the CIRCUITPY drive.
+# The atlas and sprites.py in the repo stay as the full
+# source set; packing always starts from them. To add a
+# Kenney tile to the source set itself, use --full, which
+# keeps every tile, and copy the output back over the repo's
+# CIRCUITPY/icons-tilemap-32.bmp and CIRCUITPY/sprites.py.
+#
+# Only the Python standard library is needed.
+############################################################
+import os
+import sys
+import ast
+import zlib
+import struct
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bmp import read_bmp, write_bmp
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+FIRMWARE_DIR = os.path.join(ROOT, "CIRCUITPY")
+KENNEY_TILEMAP = os.path.join(ROOT, "third-party", "kenney_1-bit-input-prompts-pixel-16", "tilemap_white_packed.png")
+
+ATLAS_FILE = "icons-tilemap-32.bmp"
+SPRITES_FILE = "sprites.py"
+
+TILE_SIZE = 32
+KENNEY_TILE_SIZE = 16
+
+# Tiles per row in the packed atlas, the same as the source atlas
+ATLAS_COLUMNS = 8
+
+##############################
+# sprites.py
+##############################
+# The NAME = index constants in a sprites.py, in file order
+def read_sprite_names(path):
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+
+    names = {}
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            if isinstance(node.value, ast.Constant) and isinstance(node.value.value, int):
+                names[node.targets[0].id] = node.value.value
+
+    return names
+
+def write_sprites_module(path, names, source):
+    lines = [
+        f"# Generated by tools/pack_sprites.py from {source}. Don't edit; rerun the packer.",
+        f"# index = tile_y * {ATLAS_COLUMNS} + tile_x",
+    ]
+
+    row = None
+
+    for name, index in sorted(names.items(), key=lambda item: item[1]):
+        if index // ATLAS_COLUMNS != row:
+            row = index // ATLAS_COLUMNS
+            lines.append("")
+
+        lines.append(f"{name} = {index}")
+
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+##############################
+# Finding the sprites in use
+##############################
+def _firmware_sources(firmware_dir):
+    for directory, subdirectories, files in os.walk(firmware_dir):
+        # Libraries are compiled .mpy files, and never use sprites.py
+        subdirectories[:] = [d for d in subdirectories if d != "lib" and not d.startswith(".")]
+
+        for file in files:
+            if file.endswith(".py") and not (directory == firmware_dir and file == SPRITES_FILE):
+                yield os.path.join(directory, file)
+
+# Names of sprites used by one firmware source file. Counts sprites.NAME when the file imports
+# sprites, and bare names when it imports them from sprites (by name, or all of them with *).
+def _sprites_used_by(path, sprite_names):
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+
+    module_names = set()
+    imported = set()
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name == "sprites":
+                    module_names.add(alias.asname or alias.name)
+        elif isinstance(node, ast.ImportFrom) and node.module == "sprites":
+            for alias in node.names:
+                if alias.name == "*":
+                    imported.update(sprite_names)
+                else:
+                    imported.add(alias.asname or alias.name)
+
+    used = set()
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id in module_names:
+            if node.attr in sprite_names:
+                used.add(node.attr)
+        elif isinstance(node, ast.Name) and node.id in imported and node.id in sprite_names:
+            used.add(node.id)
+
+    return used
+
+def find_used_sprites(firmware_dir, sprite_names):
+    used = set()
+
+    for path in _firmware_sources(firmware_dir):
+        used |= _sprites_used_by(path, sprite_names)
+
+    return used
+
+##############################
+# Images
+##############################
+# A tile is a TILE_SIZE x TILE_SIZE list of rows of 0/1 values
+
+def read_tiles(atlas_path):
+    width, height, colors, rows = read_bmp(atlas_path)
+
+    if len(colors) > 2:
+        raise ValueError(f"{atlas_path}: expected a 1-bit atlas, found {len(colors)} colors")
+
+    columns = width // TILE_SIZE
+    tiles = []
+
+    for tile_y in range(height // TILE_SIZE):
+        for tile_x in range(columns):
+            tiles.append([
+                list(rows[tile_y * TILE_SIZE + y][tile_x * TILE_SIZE:(tile_x + 1) * TILE_SIZE])
+                for y in range(TILE_SIZE)
+            ])
+
+    return (colors, tiles)
+
+def pack_atlas(tiles):
+    rows_of_tiles = (len(tiles) + ATLAS_COLUMNS - 1) // ATLAS_COLUMNS
+    blank = [0] * TILE_SIZE
+    rows = []
+
+    for tile_row in range(rows_of_tiles):
+        row_tiles = tiles[tile_row * ATLAS_COLUMNS:(tile_row + 1) * ATLAS_COLUMNS]
+
+        for y in range(TILE_SIZE):
+            row = []
+
+            for column in range(ATLAS_COLUMNS):
+                row += row_tiles[column][y] if column < len(row_tiles) else blank
+
+            rows.append(row)
+
+    return rows
+
+##############################
+# Kenney PNG tilemap
+##############################
+def _unfilter_png(data, width, height, bits_per_pixel):
+    bytes_per_pixel = max(1, bits_per_pixel // 8)
+    stride = (width * bits_per_pixel + 7) // 8
+    rows = []
+    previous = bytearray(stride)
+    offset = 0
+
+    for _ in range(height):
+        filter_type = data[offset]
+        line = bytearray(data[offset + 1:offset + 1 + stride])
+        offset += 1 + stride
+
+        for i in range(stride):
+            left = line[i - bytes_per_pixel] if i >= bytes_per_pixel else 0
+            up = previous[i]
+            up_left = previous[i - bytes_per_pixel] if i >= bytes_per_pixel else 0
+
+            if filter_type == 1:
+                line[i] = (line[i] + left) & 0xFF
+            elif filter_type == 2:
+                line[i] = (line[i] + up) & 0xFF
+            elif filter_type == 3:
+                line[i] = (line[i] + (left + up) // 2) & 0xFF
+            elif filter_type == 4:
+                estimate = left + up - up_left
+                distances = (abs(estimate - left), abs(estimate - up), abs(estimate - up_left))
+                predictor = (left, up, up_left)[distances.index(min(distances))]
+                line[i] = (line[i] + predictor) & 0xFF
+
+        rows.append(line)
+        previous = line
+
+    return rows
+
+# Reads a non-interlaced 8-bit RGBA or palettized PNG.
+# Returns rows of 0/1: 1 where a pixel is opaque and bright (the icon), 0 elsewhere.
+def read_png_mask(path):
+    with open(path, "rb") as f:
+        data = f.read()
+
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError(f"{path} is not a PNG file")
+
+    offset = 8
+    compressed = bytearray()
+    palette = []
+    alphas = b""
+
+    while offset < len(data):
+        length, chunk_type = struct.unpack_from(">I4s", data, offset)
+        chunk = data[offset + 8:offset + 8 + length]
+        offset += 12 + length
+
+        if chunk_type == b"IHDR":
+            width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", chunk)
+        elif chunk_type == b"PLTE":
+            palette = [tuple(chunk[i:i + 3]) for i in range(0, len(chunk), 3)]
+        elif chunk_type == b"tRNS":
+            alphas = chunk
+        elif chunk_type == b"IDAT":
+            compressed += chunk
+        elif chunk_type == b"IEND":
+            break
+
+    if interlace != 0 or not ((color_type == 3 and bit_depth in (1, 2, 4, 8)) or (color_type == 6 and bit_depth == 8)):
+        raise ValueError(f"{path}: only non-interlaced palettized or 8-bit RGBA PNGs are supported")
+
+    bits_per_pixel = bit_depth if color_type == 3 else 32
+    rows = _unfilter_png(zlib.decompress(bytes(compressed)), width, height, bits_per_pixel)
+    mask = []
+
+    for line in rows:
+        mask_row = []
+
+        for x in range(width):
+            if color_type == 3:
+                bit = x * bit_depth
+                index = (line[bit >> 3] >> (8 - bit_depth - (bit & 7))) & ((1 << bit_depth) - 1)
+                r, g, b = palette[index]
+                alpha = alphas[index] if index < len(alphas) else 255
+            else:
+                r, g, b, alpha = line[x * 4:x * 4 + 4]
+
+            mask_row.append(1 if alpha >= 128 and r + g + b >= 384 else 0)
+
+        mask.append(mask_row)
+
+    return mask
+
+# One Kenney tile, doubled to TILE_SIZE
+def kenney_tile(mask, column, row):
+    scale = TILE_SIZE // KENNEY_TILE_SIZE
+    left = column * KENNEY_TILE_SIZE
+    top = row * KENNEY_TILE_SIZE
+
+    if top + KENNEY_TILE_SIZE > len(mask) or left + KENNEY_TILE_SIZE > len(mask[0]):
+        raise ValueError(f"Kenney tile {column},{row} is outside the tilemap")
+
+    return [
+        [mask[top + y // scale][left + x // scale] for x in range(TILE_SIZE)]
+        for y in range(TILE_SIZE)
+    ]
+
+def _parse_addition(text):
+    try:
+        name, position = text.split("=")
+        column, row = position.split(",")
+        return (name.strip(), int(column), int(row))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected NAME=COLUMN,ROW, got '{text}'")
+
+##############################
+# Main
+##############################
+def main():
+    parser = argparse.ArgumentParser(description="Pack the sprites the firmware uses into a minimal 1-bit atlas, and regenerate sprites.py")
+    parser.add_argument("--firmware", default=FIRMWARE_DIR, help="firmware directory with the source atlas, sprites.py and user/activities.py")
+    parser.add_argument("--out-dir", default=os.path.join(ROOT, "build", "sprites"), help="where to write the atlas and sprites.py")
+    parser.add_argument("--keep", nargs="*", default=[], metavar="NAME", help="sprites to keep even if nothing uses them")
+    parser.add_argument("--add", nargs="*", default=[], type=_parse_addition, metavar="NAME=COLUMN,ROW", help="add a tile from the Kenney tilemap")
+    parser.add_argument("--kenney", default=KENNEY_TILEMAP, help="Kenney 1-bit input prompts tilemap (16x16 tiles)")
+    parser.add_argument("--full", action="store_true", help="keep every sprite, not just the ones in use")
+    args = parser.parse_args()
+
+    atlas_path = os.path.join(args.firmware, ATLAS_FILE)
+    sprite_names = read_sprite_names(os.path.join(args.firmware, SPRITES_FILE))
+    colors, tiles = read_tiles(atlas_path)
+
+    for name, index in sprite_names.items():
+        if index >= len(tiles):
+            parser.error(f"{SPRITES_FILE}: {name} = {index} is past the end of {ATLAS_FILE} ({len(tiles)} tiles)")
+
+    for name in args.keep:
+        if name not in sprite_names:
+            parser.error(f"--keep: no sprite named {name} in {SPRITES_FILE}")
+
+    added = []
+
+    if args.add:
+        mask = read_png_mask(args.kenney)
+
+        for name, column, row in args.add:
+            if name in sprite_names or name in (added_name for added_name, _ in added):
+                parser.error(f"--add: {name} is already a sprite")
+
+            added.append((name, kenney_tile(mask, column, row)))
+
+    if args.full:
+        # Every tile stays where it is, named or not, so the output can replace the source set
+        atlas_tiles = list(tiles)
+        packed_names = dict(sprite_names)
+    else:
+        kept = find_used_sprites(args.firmware, sprite_names) | set(args.keep)
+
+        # Kept sprites stay in the same order
+        order = sorted(kept, key=sprite_names.get)
+        atlas_tiles = [tiles[sprite_names[name]] for name in order]
+        packed_names = {name: index for index, name in enumerate(order)}
+
+    # Added tiles go at the end
+    for name, tile in added:
+        packed_names[name] = len(atlas_tiles)
+        atlas_tiles.append(tile)
+
+    if not atlas_tiles:
+        parser.error("no sprites are used; nothing to pack")
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    write_bmp(os.path.join(args.out_dir, ATLAS_FILE), colors, pack_atlas(atlas_tiles))
+    write_sprites_module(os.path.join(args.out_dir, SPRITES_FILE), packed_names, ATLAS_FILE)
+
+    source_size = os.path.getsize(atlas_path)
+    packed_size = os.path.getsize(os.path.join(args.out_dir, ATLAS_FILE))
+    dropped = sorted(set(sprite_names) - set(packed_names), key=sprite_names.get)
+
+    print(f"Packed {len(atlas_tiles)} tiles ({len(added)} added) from {len(tiles)} in {ATLAS_FILE}: {source_size} -> {packed_size} bytes")
+    print(f"Dropped: {', '.join(dropped) or '-'}")
+    print(f"Wrote {ATLAS_FILE} and {SPRITES_FILE} to {os.path.abspath(args.out_dir)}")
+
+if __name__ == "__main__":
+    main()
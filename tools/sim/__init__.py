@@ -0,0 +1,19 @@
+############################################################
+# Host-side hardware simulator
+#
+# Drop-in fakes for the CircuitPython modules and drivers the
+# firmware imports, plus a virtual clock, so that run.py,
+# Device, RemoteMode and PreferencesMode run unmodified under
+# CPython on a workstation.
+#
+#     from sim import Simulator
+#
+#     simulator = Simulator()
+#     run = simulator.boot()
+#     simulator.tap(function_key.SELECT)
+#     simulator.run_for(1000)
+#
+# See tools/simulate.py for a command line runner.
+############################################################
+from sim.clock import VirtualClock
+from sim.simulator import Simulator, HIDReport
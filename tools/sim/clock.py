@@ -0,0 +1,80 @@
+import time
+
+##############################
+# VirtualClock class
+##############################
+# Simulated monotonic time, in nanoseconds. Time only moves when the firmware
+# sleeps or the simulator advances it, so runs are deterministic and a minute
+# of device time takes as long as the work done in it.
+# Optionally also counts the real time spent running firmware code, so that
+# timings measured with the clock (e.g. the profiler) reflect host speed.
+class VirtualClock:
+    def __init__(self, start_ms=0, count_real_time=False):
+        self._now_ns = start_ms * 1_000_000
+        self._count_real_time = count_real_time
+        self._real_mark = time.perf_counter_ns()
+        self._patched = None
+
+    @property
+    def count_real_time(self):
+        return self._count_real_time
+
+    @count_real_time.setter
+    def count_real_time(self, value):
+        self._sync()
+        self._count_real_time = value
+
+    def monotonic_ns(self):
+        self._sync()
+        return self._now_ns
+
+    def monotonic(self):
+        return self.monotonic_ns() / 1_000_000_000
+
+    def ticks_ms(self):
+        return self.monotonic_ns() // 1_000_000
+
+    def sleep(self, seconds):
+        if seconds < 0:
+            raise ValueError("sleep length must be non-negative")
+
+        self.advance_ns(int(seconds * 1_000_000_000))
+
+    def advance_ns(self, duration):
+        self._sync()
+        self._now_ns += duration
+
+    def advance_ms(self, duration):
+        self.advance_ns(int(duration * 1_000_000))
+
+    # Move the clock forward to 'ns' if it's in the future
+    def advance_to_ns(self, ns):
+        self._sync()
+
+        if ns > self._now_ns:
+            self._now_ns = ns
+
+    # Route time.sleep(), time.monotonic() and time.monotonic_ns() through the clock
+    def patch_time(self):
+        if self._patched is not None:
+            return
+
+        self._patched = (time.sleep, time.monotonic, time.monotonic_ns)
+        time.sleep = self.sleep
+        time.monotonic = self.monotonic
+        time.monotonic_ns = self.monotonic_ns
+
+    def unpatch_time(self):
+        if self._patched is None:
+            return
+
+        time.sleep, time.monotonic, time.monotonic_ns = self._patched
+        self._patched = None
+
+    def _sync(self):
+        now = time.perf_counter_ns()
+
+        if self._count_real_time:
+            self._now_ns += now - self._real_mark
+
+        self._real_mark = now
@@ -0,0 +1,31 @@
+# Fake adafruit_ble package. The connection state is the simulator's.
+from sim import state
+
+class BLERadio:
+    def __init__(self, adapter=None):
+        self.name = "CIRCUITPY"
+        self.tx_power = 0
+
+    @property
+    def connected(self):
+        return state.current().connected
+
+    @property
+    def connections(self):
+        return (object(),) if state.current().connected else ()
+
+    # Like the real radio, advertising stops once a host connects
+    @property
+    def advertising(self):
+        simulator = state.current()
+
+        if simulator.connected:
+            simulator.advertising = False
+
+        return simulator.advertising
+
+    def start_advertising(self, advertisement, scan_response=None, interval=0.1, timeout=None):
+        state.current().advertising = True
+
+    def stop_advertising(self):
+        state.current().advertising = False
@@ -0,0 +1,7 @@
+# Fake adafruit_ble.advertising module
+class Advertisement:
+    def __init__(self, *, entry=None):
+        self.complete_name = None
+        self.short_name = None
+        self.appearance = None
+        self.connectable = True
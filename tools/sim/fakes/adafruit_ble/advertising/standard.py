@@ -0,0 +1,7 @@
+# Fake adafruit_ble.advertising.standard module
+from adafruit_ble.advertising import Advertisement
+
+class ProvideServicesAdvertisement(Advertisement):
+    def __init__(self, *services, entry=None):
+        super().__init__(entry=entry)
+        self.services = services
@@ -0,0 +1,5 @@
+# Fake adafruit_ble.services module
+class Service:
+    def __init__(self, *, service=None, secondary=False, **initial_values):
+        for name, value in initial_values.items():
+            setattr(self, name, value)
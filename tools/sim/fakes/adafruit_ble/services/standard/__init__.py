@@ -0,0 +1 @@
+# Fake adafruit_ble.services.standard package
@@ -0,0 +1,22 @@
+# Fake adafruit_ble.services.standard.device_info module
+from adafruit_ble.services import Service
+
+class DeviceInfoService(Service):
+    def __init__(
+        self,
+        *,
+        manufacturer=None,
+        software_revision=None,
+        model_number=None,
+        serial_number=None,
+        firmware_revision=None,
+        hardware_revision="",
+        service=None
+    ):
+        super().__init__(service=service)
+        self.manufacturer = manufacturer
+        self.software_revision = software_revision
+        self.model_number = model_number
+        self.serial_number = serial_number
+        self.firmware_revision = firmware_revision
+        self.hardware_revision = hardware_revision
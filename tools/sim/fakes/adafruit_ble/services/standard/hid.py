@@ -0,0 +1,32 @@
+# Fake adafruit_ble.services.standard.hid module.
+# Every report sent is recorded by the simulator.
+from sim import state
+from adafruit_ble.services import Service
+
+##############################
+# ReportOut class
+##############################
+# One HID device (report ID) of the HID service
+class ReportOut:
+    def __init__(self, name, usage_page, usage, report_length):
+        self.name = name
+        self.usage_page = usage_page
+        self.usage = usage
+        self._report_length = report_length
+        self.last_received_report = None
+
+    def send_report(self, report):
+        if len(report) != self._report_length:
+            raise ValueError(f"{self.name} report must be {self._report_length} bytes")
+
+        state.current().record_hid_report(self.name, report)
+
+class HIDService(Service):
+    def __init__(self, hid_descriptor=None, service=None):
+        super().__init__(service=service)
+
+        self.devices = (
+            ReportOut("keyboard", 0x01, 0x06, 8),
+            ReportOut("mouse", 0x01, 0x02, 4),
+            ReportOut("consumer_control", 0x0C, 0x01, 2),
+        )
@@ -0,0 +1,92 @@
+# Fake adafruit_display_text.label module. Sizes text with the terminal
+# font's fixed glyph size, so layout code sees realistic widths.
+from displayio import Group
+
+class Label(Group):
+    def __init__(
+        self,
+        font,
+        *,
+        text="",
+        color=0xFFFFFF,
+        background_color=None,
+        scale=1,
+        padding_top=0,
+        padding_bottom=0,
+        padding_left=0,
+        padding_right=0,
+        anchor_point=None,
+        anchored_position=None,
+        line_spacing=1.25,
+        **kwargs
+    ):
+        super().__init__(scale=scale, x=kwargs.get("x", 0), y=kwargs.get("y", 0))
+
+        self._font = font
+        self._glyph_width, self._glyph_height = font.get_bounding_box()
+        self.color = color
+        self.background_color = background_color
+        self.padding_top = padding_top
+        self.padding_bottom = padding_bottom
+        self.padding_left = padding_left
+        self.padding_right = padding_right
+        self.line_spacing = line_spacing
+        self._anchor_point = anchor_point if anchor_point is not None else (0, 0)
+        self._anchored_position = anchored_position if anchored_position is not None else (0, 0)
+        self._text = None
+
+        # Number of times the text changed, for benchmarks
+        self.text_changes = 0
+        self.text = text
+
+    @property
+    def font(self):
+        return self._font
+
+    @property
+    def text(self):
+        return self._text
+
+    @text.setter
+    def text(self, text):
+        text = str(text)
+
+        if text == self._text:
+            return
+
+        self._text = text
+        self.text_changes += 1
+
+        lines = text.split("\n")
+        self._width = max(len(line) for line in lines) * self._glyph_width
+        self._height = int(self._glyph_height * (1 + (len(lines) - 1) * self.line_spacing))
+
+    @property
+    def width(self):
+        return self._width
+
+    @property
+    def height(self):
+        return self._height
+
+    @property
+    def bounding_box(self):
+        return (0, -self._height // 2, self._width, self._height)
+
+    @property
+    def anchor_point(self):
+        return self._anchor_point
+
+    @anchor_point.setter
+    def anchor_point(self, point):
+        self._anchor_point = point
+
+    @property
+    def anchored_position(self):
+        return self._anchored_position
+
+    @anchored_position.setter
+    def anchored_position(self, position):
+        self._anchored_position = position
+        self.x = int(position[0] - self._anchor_point[0] * self._width * self.scale)
+        self.y = int(position[1] - self._anchor_point[1] * self._height * self.scale)
@@ -0,0 +1,8 @@
+# Fake adafruit_hid package, with the same report handling as the real library
+
+def find_device(devices, *, usage_page, usage, timeout=None):
+    for device in devices:
+        if device.usage_page == usage_page and device.usage == usage:
+            return device
+
+    raise ValueError("Could not find matching HID device.")
@@ -0,0 +1,70 @@
+# Same character mapping as adafruit_hid.keyboard_layout_us
+from adafruit_hid.keycode import Keycode
+
+# Keycode for each ASCII character, with the high bit set if shift is needed.
+# 0 means the character can't be typed.
+_SHIFT_FLAG = 0x80
+
+def _build_ascii_to_keycode():
+    table = bytearray(128)
+
+    table[0x08] = Keycode.BACKSPACE
+    table[0x09] = Keycode.TAB
+    table[0x0A] = Keycode.ENTER
+    table[0x1B] = Keycode.ESCAPE
+    table[0x7F] = Keycode.DELETE
+
+    unshifted = {
+        " ": Keycode.SPACEBAR, "'": Keycode.QUOTE, ",": Keycode.COMMA, "-": Keycode.MINUS,
+        ".": Keycode.PERIOD, "/": Keycode.FORWARD_SLASH, ";": Keycode.SEMICOLON, "=": Keycode.EQUALS,
+        "[": Keycode.LEFT_BRACKET, "\\": Keycode.BACKSLASH, "]": Keycode.RIGHT_BRACKET, "`": Keycode.GRAVE_ACCENT,
+    }
+
+    shifted = {
+        "!": Keycode.ONE, "@": Keycode.TWO, "#": Keycode.THREE, "$": Keycode.FOUR, "%": Keycode.FIVE,
+        "^": Keycode.SIX, "&": Keycode.SEVEN, "*": Keycode.EIGHT, "(": Keycode.NINE, ")": Keycode.ZERO,
+        '"': Keycode.QUOTE, "<": Keycode.COMMA, "_": Keycode.MINUS, ">": Keycode.PERIOD,
+        "?": Keycode.FORWARD_SLASH, ":": Keycode.SEMICOLON, "+": Keycode.EQUALS, "{": Keycode.LEFT_BRACKET,
+        "|": Keycode.BACKSLASH, "}": Keycode.RIGHT_BRACKET, "~": Keycode.GRAVE_ACCENT,
+    }
+
+    for char, keycode in unshifted.items():
+        table[ord(char)] = keycode
+
+    for char, keycode in shifted.items():
+        table[ord(char)] = keycode | _SHIFT_FLAG
+
+    table[ord("0")] = Keycode.ZERO
+
+    for i in range(9):
+        table[ord("1") + i] = Keycode.ONE + i
+
+    for i in range(26):
+        table[ord("a") + i] = Keycode.A + i
+        table[ord("A") + i] = (Keycode.A + i) | _SHIFT_FLAG
+
+    return bytes(table)
+
+class KeyboardLayoutUS:
+    ASCII_TO_KEYCODE = _build_ascii_to_keycode()
+
+    def __init__(self, keyboard):
+        self.keyboard = keyboard
+
+    def write(self, string, delay=None):
+        for char in string:
+            keycodes = self.keycodes(char)
+            self.keyboard.press(*keycodes)
+            self.keyboard.release_all()
+
+    def keycodes(self, char):
+        code = ord(char)
+        keycode = self.ASCII_TO_KEYCODE[code] if code < 128 else 0
+
+        if keycode == 0:
+            raise ValueError("No keycode available for character {char}.".format(char=char))
+
+        if keycode & _SHIFT_FLAG:
+            return (Keycode.SHIFT, keycode & ~_SHIFT_FLAG)
+
+        return (keycode,)
@@ -0,0 +1,6 @@
+# Fake adafruit_ili9341 module
+from displayio import Display
+
+class ILI9341(Display):
+    def __init__(self, bus, **kwargs):
+        super().__init__(bus, b"", **kwargs)
@@ -0,0 +1,25 @@
+# Fake adafruit_imageload. Loads palettized BMPs only, which is all the firmware uses.
+from sim import state
+from bmp import read_bmp
+
+def load(file_or_filename, *, bitmap=None, palette=None):
+    path = file_or_filename if isinstance(file_or_filename, str) else file_or_filename.name
+    width, height, colors, rows = read_bmp(state.current().firmware_path(path))
+
+    loaded_bitmap = None
+    loaded_palette = None
+
+    if bitmap is not None:
+        loaded_bitmap = bitmap(width, height, len(colors))
+
+        for y, row in enumerate(rows):
+            for x, value in enumerate(row):
+                loaded_bitmap[x, y] = value
+
+    if palette is not None:
+        loaded_palette = palette(len(colors))
+
+        for i, color in enumerate(colors):
+            loaded_palette[i] = color
+
+    return (loaded_bitmap, loaded_palette)
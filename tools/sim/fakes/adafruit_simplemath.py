@@ -0,0 +1,26 @@
+# Same as the adafruit_simplemath library
+
+def map_range(x, in_min, in_max, out_min, out_max):
+    mapped = map_unconstrained_range(x, in_min, in_max, out_min, out_max)
+    return constrain(mapped, out_min, out_max)
+
+def map_unconstrained_range(x, in_min, in_max, out_min, out_max):
+    in_range = in_max - in_min
+    in_delta = x - in_min
+
+    if in_range != 0:
+        mapped = in_delta / in_range
+    elif in_delta != 0:
+        mapped = in_delta
+    else:
+        mapped = 0.5
+
+    mapped *= out_max - out_min
+    mapped += out_min
+    return mapped
+
+def constrain(x, a, b):
+    if a > b:
+        a, b = b, a
+
+    return min(max(x, a), b)
@@ -0,0 +1,81 @@
+# Fake adafruit_stmpe610 module (Keyboard Featherwing Rev1 touch controller).
+# Only found if the simulator is set up with this controller.
+# While touched, samples queue up in the FIFO at the controller's sample rate.
+from collections import deque
+from sim import state
+
+# Samples per second while touched
+SAMPLE_RATE = 200
+
+# Samples the FIFO holds before it stops filling
+FIFO_SIZE = 128
+
+class Adafruit_STMPE610:
+    def __init__(self):
+        if state.current().touch_controller != "stmpe610":
+            raise RuntimeError("Failed to find STMPE610! Chip Version 0x0")
+
+        self._fifo = deque()
+        self._last_sample_time = None
+
+    def _fill_fifo(self):
+        simulator = state.current()
+        now = simulator.clock.monotonic_ns()
+
+        if not simulator.touched:
+            self._last_sample_time = None
+            return
+
+        if self._last_sample_time is None:
+            self._last_sample_time = now
+            self._fifo.append(simulator.read_touch_data())
+            return
+
+        interval = 1_000_000_000 // SAMPLE_RATE
+
+        while now - self._last_sample_time >= interval:
+            self._last_sample_time += interval
+
+            if len(self._fifo) < FIFO_SIZE:
+                self._fifo.append(simulator.read_touch_data())
+
+    @property
+    def touched(self):
+        self._fill_fifo()
+        return state.current().touched
+
+    @property
+    def buffer_size(self):
+        self._fill_fifo()
+        return len(self._fifo)
+
+    @property
+    def buffer_empty(self):
+        return self.buffer_size == 0
+
+    # Oldest sample in the FIFO as (x, y, pressure), like the driver
+    def read_data(self):
+        self._fill_fifo()
+
+        if self._fifo:
+            return self._fifo.popleft()
+
+        return state.current().read_touch_data()
+
+    @property
+    def touches(self):
+        points = []
+
+        while not self.buffer_empty:
+            x, y, pressure = self.read_data()
+            points.append({"x": x, "y": y, "pressure": pressure})
+
+        return points
+
+class Adafruit_STMPE610_I2C(Adafruit_STMPE610):
+    def __init__(self, i2c, address=0x41):
+        super().__init__()
+
+class Adafruit_STMPE610_SPI(Adafruit_STMPE610):
+    def __init__(self, spi, cs, baudrate=1_000_000):
+        super().__init__()
@@ -0,0 +1,23 @@
+# Same interface as the adafruit_ticks library, driven by the simulator's clock
+from sim import state
+
+_TICKS_PERIOD = 1 << 29
+_TICKS_MAX = _TICKS_PERIOD - 1
+_TICKS_HALFPERIOD = _TICKS_PERIOD // 2
+
+def ticks_ms():
+    return state.current().clock.ticks_ms() & _TICKS_MAX
+
+def ticks_add(ticks, delta):
+    if -_TICKS_HALFPERIOD < delta < _TICKS_HALFPERIOD:
+        return (ticks + delta) % _TICKS_PERIOD
+
+    raise OverflowError("ticks interval overflow")
+
+def ticks_diff(ticks1, ticks2):
+    diff = (ticks1 - ticks2) & _TICKS_MAX
+    diff = ((diff + _TICKS_HALFPERIOD) & _TICKS_MAX) - _TICKS_HALFPERIOD
+    return diff
+
+def ticks_less(ticks1, ticks2):
+    return ticks_diff(ticks2, ticks1) > 0
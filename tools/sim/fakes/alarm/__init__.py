@@ -0,0 +1,22 @@
+# Fake alarm module. Light sleep just moves the simulator's clock forward
+# to the earliest time alarm.
+from sim import state
+from alarm import pin, time
+
+wake_alarm = None
+
+def light_sleep_until_alarms(*alarms):
+    global wake_alarm
+
+    time_alarms = [a for a in alarms if isinstance(a, time.TimeAlarm)]
+
+    if not time_alarms:
+        raise ValueError("The simulator can only wake from light sleep on a time alarm")
+
+    earliest = min(time_alarms, key=lambda a: a.monotonic_time)
+    state.current().clock.advance_to_ns(int(earliest.monotonic_time * 1_000_000_000))
+    wake_alarm = earliest
+    return earliest
+
+def exit_and_deep_sleep_until_alarms(*alarms, preserve_dios=()):
+    raise NotImplementedError("The simulator doesn't deep sleep")
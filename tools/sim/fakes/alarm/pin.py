@@ -0,0 +1,5 @@
+# Fake alarm.pin module
+class PinAlarm:
+    def __init__(self, pin, value, edge=False, pull=False):
+        self.pin = pin
+        self.value = value
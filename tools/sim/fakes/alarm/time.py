@@ -0,0 +1,7 @@
+# Fake alarm.time module
+class TimeAlarm:
+    def __init__(self, *, monotonic_time=None, epoch_time=None):
+        if monotonic_time is None:
+            raise ValueError("The simulator only supports monotonic_time")
+
+        self.monotonic_time = monotonic_time
@@ -0,0 +1,13 @@
+# Fake analogio module. Reads the simulator's battery voltage,
+# through the Feather's 1/2 voltage divider.
+from sim import state
+from sim.fakes_support import Deinitable
+
+class AnalogIn(Deinitable):
+    def __init__(self, pin):
+        self.reference_voltage = 3.3
+
+    @property
+    def value(self):
+        voltage = state.current().battery_voltage / 2
+        return max(0, min(65535, int(voltage / self.reference_voltage * 65536)))
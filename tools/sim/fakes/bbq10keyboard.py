@@ -0,0 +1,76 @@
+# Fake bbq10keyboard module. Key events come from the simulator's key FIFO.
+from sim import state
+
+STATE_IDLE = 0
+STATE_PRESS = 1
+STATE_LONG_PRESS = 2
+STATE_RELEASE = 3
+
+# Keyboard GPIO expander pin wired to the SD card's card detect switch
+_SD_DETECT_PIN = 1
+
+##############################
+# Pin class
+##############################
+# A pin on the keyboard's GPIO expander
+class _Pin:
+    def __init__(self, pin):
+        self._pin = pin
+        self.pull = None
+        self.direction = "INPUT"
+
+    def switch_to_input(self, pull=None):
+        self.pull = pull
+        self.direction = "INPUT"
+
+    def switch_to_output(self, value=False, drive_mode=None):
+        self.direction = "OUTPUT"
+
+    @property
+    def value(self):
+        # The card detect switch pulls low when a card is inserted
+        if self._pin == _SD_DETECT_PIN:
+            return not state.current().sd_card
+
+        return True
+
+class BBQ10Keyboard:
+    def __init__(self, i2c, address=0x1F, interrupt=None):
+        self._i2c = i2c
+
+    @property
+    def keyboard_backlight(self):
+        return state.current().keyboard_backlight
+
+    @keyboard_backlight.setter
+    def keyboard_backlight(self, value):
+        state.current().keyboard_backlight = value
+
+    @property
+    def display_backlight(self):
+        return state.current().display_backlight
+
+    @display_backlight.setter
+    def display_backlight(self, value):
+        state.current().display_backlight = value
+
+    @property
+    def key_count(self):
+        return len(state.current().key_fifo)
+
+    # Pops every pending key event, as a list of (state, key)
+    @property
+    def keys(self):
+        fifo = state.current().key_fifo
+        events = []
+
+        while fifo:
+            events.append(fifo.popleft())
+
+        return events
+
+    def get_pin(self, pin):
+        return _Pin(pin)
+
+    def reset(self):
+        state.current().key_fifo.clear()
@@ -0,0 +1,27 @@
+# Fake bitmaptools module. Only what the firmware uses.
+
+def blit(dest_bitmap, source_bitmap, x, y, *, x1=0, y1=0, x2=None, y2=None, skip_source_index=None, skip_dest_index=None):
+    if x2 is None:
+        x2 = source_bitmap.width
+
+    if y2 is None:
+        y2 = source_bitmap.height
+
+    for source_y in range(y1, y2):
+        dest_y = y + source_y - y1
+
+        if not 0 <= dest_y < dest_bitmap.height:
+            continue
+
+        for source_x in range(x1, x2):
+            dest_x = x + source_x - x1
+
+            if not 0 <= dest_x < dest_bitmap.width:
+                continue
+
+            value = source_bitmap[source_x, source_y]
+
+            if value == skip_source_index or dest_bitmap[dest_x, dest_y] == skip_dest_index:
+                continue
+
+            dest_bitmap[dest_x, dest_y] = value
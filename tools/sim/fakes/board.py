@@ -0,0 +1,32 @@
+# Fake board module for the Feather nRF52840 Express
+from sim.fakes_support import Pin
+
+SCL = Pin("SCL")
+SDA = Pin("SDA")
+SCK = Pin("SCK")
+MOSI = Pin("MOSI")
+MISO = Pin("MISO")
+A0 = Pin("A0")
+A1 = Pin("A1")
+A2 = Pin("A2")
+A3 = Pin("A3")
+A4 = Pin("A4")
+A5 = Pin("A5")
+D5 = Pin("D5")
+D6 = Pin("D6")
+D9 = Pin("D9")
+D10 = Pin("D10")
+D11 = Pin("D11")
+D12 = Pin("D12")
+D13 = Pin("D13")
+VOLTAGE_MONITOR = Pin("VOLTAGE_MONITOR")
+NEOPIXEL = Pin("NEOPIXEL")
+SWITCH = Pin("SWITCH")
+
+def I2C():
+    import busio
+    return busio.I2C(SCL, SDA)
+
+def SPI():
+    import busio
+    return busio.SPI(SCK, MOSI=MOSI, MISO=MISO)
@@ -0,0 +1,38 @@
+# Fake busio module
+from sim.fakes_support import Deinitable
+
+class I2C(Deinitable):
+    def __init__(self, scl, sda, frequency=100_000, timeout=255):
+        self.frequency = frequency
+        self._locked = False
+
+    def try_lock(self):
+        if self._locked:
+            return False
+
+        self._locked = True
+        return True
+
+    def unlock(self):
+        self._locked = False
+
+    def scan(self):
+        return []
+
+class SPI(Deinitable):
+    def __init__(self, clock, MOSI=None, MISO=None, half_duplex=False):
+        self.frequency = 8_000_000
+        self._locked = False
+
+    def configure(self, baudrate=100_000, polarity=0, phase=0, bits=8):
+        self.frequency = baudrate
+
+    def try_lock(self):
+        if self._locked:
+            return False
+
+        self._locked = True
+        return True
+
+    def unlock(self):
+        self._locked = False
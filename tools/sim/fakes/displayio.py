@@ -0,0 +1,253 @@
+# Fake displayio module. Keeps the same object graph as the real one
+# (groups, tile grids, bitmaps, palettes) without drawing anything.
+from sim import state
+from bmp import read_bmp
+
+def release_displays():
+    state.current().display = None
+
+##############################
+# Palette class
+##############################
+class Palette:
+    def __init__(self, color_count, dither=False):
+        self._colors = [0] * color_count
+        self._transparent = [False] * color_count
+
+    def __len__(self):
+        return len(self._colors)
+
+    def __getitem__(self, index):
+        return self._colors[index]
+
+    def __setitem__(self, index, color):
+        if isinstance(color, (tuple, list)):
+            color = (color[0] << 16) | (color[1] << 8) | color[2]
+
+        self._colors[index] = color
+
+    def make_transparent(self, index):
+        self._transparent[index] = True
+
+    def make_opaque(self, index):
+        self._transparent[index] = False
+
+    def is_transparent(self, index):
+        return self._transparent[index]
+
+##############################
+# Bitmap class
+##############################
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        if value_count < 1 or value_count > 65536:
+            raise ValueError("value_count must be in 1-65536")
+
+        self.width = width
+        self.height = height
+        self._value_count = value_count
+        self._pixels = bytearray(width * height) if value_count <= 256 else [0] * (width * height)
+
+    def _index(self, index):
+        if isinstance(index, tuple):
+            x, y = index
+
+            if not (0 <= x < self.width and 0 <= y < self.height):
+                raise IndexError("pixel out of bounds")
+
+            return y * self.width + x
+
+        return index
+
+    def __getitem__(self, index):
+        return self._pixels[self._index(index)]
+
+    def __setitem__(self, index, value):
+        if value >= self._value_count:
+            raise ValueError("pixel value out of range")
+
+        self._pixels[self._index(index)] = value
+
+    def fill(self, value):
+        for i in range(len(self._pixels)):
+            self._pixels[i] = value
+
+    def dirty(self, x1=0, y1=0, x2=None, y2=None):
+        pass
+
+##############################
+# OnDiskBitmap class
+##############################
+# Reads the whole file up front; the real one streams pixels from the file as it draws
+class OnDiskBitmap:
+    def __init__(self, file):
+        path = file if isinstance(file, str) else file.name
+        width, height, colors, rows = read_bmp(state.current().firmware_path(path))
+
+        self.width = width
+        self.height = height
+        self._rows = rows
+
+        self.pixel_shader = Palette(len(colors))
+
+        for i, color in enumerate(colors):
+            self.pixel_shader[i] = color
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            x, y = index
+        else:
+            x, y = index % self.width, index // self.width
+
+        return self._rows[y][x]
+
+##############################
+# TileGrid class
+##############################
+class TileGrid:
+    def __init__(
+        self,
+        bitmap,
+        *,
+        pixel_shader,
+        width=1,
+        height=1,
+        tile_width=None,
+        tile_height=None,
+        default_tile=0,
+        x=0,
+        y=0
+    ):
+        if tile_width is None:
+            tile_width = bitmap.width
+
+        if tile_height is None:
+            tile_height = bitmap.height
+
+        if bitmap.width % tile_width != 0 or bitmap.height % tile_height != 0:
+            raise ValueError("Tile size must exactly divide the bitmap size")
+
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.width = width
+        self.height = height
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self.flip_x = False
+        self.flip_y = False
+        self.transpose_xy = False
+
+        self._tile_count = (bitmap.width // tile_width) * (bitmap.height // tile_height)
+        self._tiles = [default_tile] * (width * height)
+
+    def _index(self, index):
+        if isinstance(index, tuple):
+            x, y = index
+            return y * self.width + x
+
+        return index
+
+    def __getitem__(self, index):
+        return self._tiles[self._index(index)]
+
+    def __setitem__(self, index, tile):
+        if not 0 <= tile < self._tile_count:
+            raise ValueError(f"Tile index out of bounds: {tile}")
+
+        self._tiles[self._index(index)] = tile
+
+##############################
+# Group class
+##############################
+class Group:
+    def __init__(self, *, scale=1, x=0, y=0):
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._layers = []
+
+    def _check_layer(self, layer):
+        if not isinstance(layer, (Group, TileGrid)):
+            raise TypeError("Layer must be a Group or TileGrid subclass")
+
+        if getattr(layer, "_in_group", False):
+            raise ValueError("Layer already in a group")
+
+    def append(self, layer):
+        self._check_layer(layer)
+        layer._in_group = True
+        self._layers.append(layer)
+
+    def insert(self, index, layer):
+        self._check_layer(layer)
+        layer._in_group = True
+        self._layers.insert(index, layer)
+
+    def remove(self, layer):
+        self._layers.remove(layer)
+        layer._in_group = False
+
+    def pop(self, index=-1):
+        layer = self._layers.pop(index)
+        layer._in_group = False
+        return layer
+
+    def index(self, layer):
+        return self._layers.index(layer)
+
+    def sort(self, key=None, reverse=False):
+        self._layers.sort(key=key, reverse=reverse)
+
+    def __len__(self):
+        return len(self._layers)
+
+    def __getitem__(self, index):
+        return self._layers[index]
+
+    def __setitem__(self, index, layer):
+        self._check_layer(layer)
+        self._layers[index]._in_group = False
+        layer._in_group = True
+        self._layers[index] = layer
+
+    def __delitem__(self, index):
+        self.pop(index)
+
+    def __contains__(self, layer):
+        return layer in self._layers
+
+    def __iter__(self):
+        return iter(self._layers)
+
+##############################
+# Display buses
+##############################
+class FourWire:
+    def __init__(self, spi_bus, *, command, chip_select, reset=None, baudrate=24_000_000, polarity=0, phase=0):
+        self.spi_bus = spi_bus
+
+    def reset(self):
+        pass
+
+class Display:
+    def __init__(self, display_bus, init_sequence=b"", *, width, height, rotation=0, auto_refresh=True, **kwargs):
+        self.bus = display_bus
+        self.width = width
+        self.height = height
+        self.rotation = rotation
+        self.auto_refresh = auto_refresh
+        self.root_group = None
+        self.brightness = 1.0
+
+        # Number of refresh() calls, for benchmarks
+        self.refresh_count = 0
+
+        state.current().display = self
+
+    def refresh(self, *, target_frames_per_second=None, minimum_frames_per_second=0):
+        self.refresh_count += 1
+        return True
@@ -0,0 +1,47 @@
+# Fake neopixel module
+from sim import state
+
+GRB = "GRB"
+RGB = "RGB"
+
+class NeoPixel:
+    def __init__(self, pin, n, brightness=1.0, auto_write=True, pixel_order=GRB):
+        self._pixels = [0] * n
+        self._brightness = brightness
+        self.auto_write = auto_write
+
+    def __len__(self):
+        return len(self._pixels)
+
+    def __getitem__(self, index):
+        return self._pixels[index]
+
+    def __setitem__(self, index, color):
+        self._pixels[index] = color
+        self._update()
+
+    @property
+    def brightness(self):
+        return self._brightness
+
+    @brightness.setter
+    def brightness(self, value):
+        self._brightness = min(max(value, 0.0), 1.0)
+        self._update()
+
+    def fill(self, color):
+        for i in range(len(self._pixels)):
+            self._pixels[i] = color
+
+        self._update()
+
+    def show(self):
+        self._update()
+
+    def deinit(self):
+        pass
+
+    def _update(self):
+        simulator = state.current()
+        simulator.neopixel_color = self._pixels[0] if self._pixels else 0
+        simulator.neopixel_brightness = self._brightness
@@ -0,0 +1,10 @@
+# Fake sdcardio module. The card is only there if the simulator says so.
+from sim import state
+
+class SDCard:
+    def __init__(self, spi, cs, baudrate=8_000_000):
+        if not state.current().sd_card:
+            raise OSError("no SD card")
+
+    def deinit(self):
+        pass
@@ -0,0 +1,16 @@
+# Fake storage module. Mounting makes the mount point a directory
+# in the simulator's working directory, so files land there.
+import os
+
+class VfsFat:
+    def __init__(self, block_device):
+        self._block_device = block_device
+
+def mount(filesystem, mount_path, readonly=False):
+    os.makedirs(mount_path.lstrip("/"), exist_ok=True)
+
+def umount(mount):
+    pass
+
+def remount(mount_path, readonly=False, disable_concurrent_write_protection=False):
+    pass
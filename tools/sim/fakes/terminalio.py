@@ -0,0 +1,11 @@
+# Fake terminalio module
+
+##############################
+# Font class
+##############################
+# Matches the size of the built in terminal font's glyphs
+class _Font:
+    def get_bounding_box(self):
+        return (6, 12)
+
+FONT = _Font()
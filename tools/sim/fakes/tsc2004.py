@@ -0,0 +1,15 @@
+# Fake tsc2004 module (Keyboard Featherwing Rev2 touch controller).
+# Only found if the simulator is set up with this controller.
+from sim import state
+
+class TSC2004:
+    def __init__(self, i2c, address=0x48, **kwargs):
+        if state.current().touch_controller != "tsc2004":
+            raise ValueError("No TSC2004 found at 0x48")
+
+    @property
+    def touched(self):
+        return state.current().touched
+
+    def read_data(self):
+        return state.current().read_touch_data()
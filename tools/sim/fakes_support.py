@@ -0,0 +1,25 @@
+# Shared pieces of the fake modules in sim/fakes
+
+##############################
+# Pin class
+##############################
+class Pin:
+    def __init__(self, name):
+        self._name = name
+
+    def __repr__(self):
+        return f"board.{self._name}"
+
+##############################
+# Deinitable class
+##############################
+# Most CircuitPython peripherals can be deinit'ed and used as context managers
+class Deinitable:
+    def deinit(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.deinit()
@@ -0,0 +1,296 @@
+import io
+import gc
+import os
+import sys
+import contextlib
+import shutil
+import tempfile
+import importlib
+from collections import deque, namedtuple
+from sim import state
+from sim.clock import VirtualClock
+
+SIM_DIR = os.path.dirname(os.path.abspath(__file__))
+FAKES_DIR = os.path.join(SIM_DIR, "fakes")
+DEFAULT_FIRMWARE_DIR = os.path.normpath(os.path.join(SIM_DIR, "..", "..", "CIRCUITPY"))
+
+# Key states, as reported by the BBQ10 keyboard
+STATE_PRESS = 1
+STATE_LONG_PRESS = 2
+STATE_RELEASE = 3
+
+# The BBQ10 keyboard's key FIFO holds this many events; more are dropped
+KEY_FIFO_SIZE = 31
+
+# Touch controllers
+TOUCH_TSC2004 = "tsc2004"
+TOUCH_STMPE610 = "stmpe610"
+
+# Touch pressure reported while touched
+TOUCH_PRESSURE = 100
+
+# Heap size reported by gc.mem_free() + gc.mem_alloc() (nRF52840 CircuitPython builds have about this much)
+HEAP_SIZE = 110 * 1024
+
+# One HID report handed to a (fake) BLE HID device
+HIDReport = namedtuple("HIDReport", ["time_ms", "device", "report"])
+
+##############################
+# Simulator class
+##############################
+# Owns the simulated hardware state that the fake modules in sim/fakes read and write:
+# the key FIFO, the touch panel, the BLE connection, the battery, and every HID report sent.
+# install() puts the fakes and the firmware on sys.path and patches time and gc;
+# boot() then imports run.py, exactly like code.py does on the device.
+class Simulator:
+    def __init__(
+        self,
+        firmware_dir=DEFAULT_FIRMWARE_DIR,
+        connected=True,
+        sd_card=False,
+        touch_controller=TOUCH_TSC2004,
+        battery_voltage=4.0,
+        clock=None,
+        echo=True,
+        keep_hid_reports=True
+    ):
+        self.firmware_dir = os.path.abspath(firmware_dir)
+        self.clock = clock if clock is not None else VirtualClock()
+
+        # Hardware state
+        self.connected = connected
+        self.sd_card = sd_card
+        self.touch_controller = touch_controller
+        self.battery_voltage = battery_voltage
+
+        self.key_fifo = deque()
+        self.dropped_key_events = 0
+
+        self.touched = False
+        self.touch_raw = (0, 0)
+
+        self.keyboard_backlight = 0.0
+        self.display_backlight = 0.0
+        self.neopixel_color = 0
+        self.neopixel_brightness = 1.0
+
+        self.display = None
+        self.advertising = False
+
+        # Every report sent by the fake HID devices, unless keep_hid_reports is off
+        # (e.g. so benchmarks don't count the log's allocations), and a count per device.
+        self.keep_hid_reports = keep_hid_reports
+        self.hid_reports = []
+        self.hid_report_counts = {}
+
+        # Print the firmware's serial output; otherwise it's thrown away
+        self.echo = echo
+
+        self._work_dir = None
+        self._old_cwd = None
+        self._old_path = None
+        self._old_modules = None
+        self._gc_patched = None
+        self._affine = None
+
+    ##############################
+    # Setup
+    ##############################
+    # Make the fakes and the firmware importable, patch time and gc, and switch to a
+    # scratch working directory (the firmware's relative paths, like 'sd/prefs.dat', land there).
+    def install(self):
+        if state.simulator is not None:
+            raise RuntimeError("A simulator is already installed")
+
+        state.simulator = self
+
+        self._old_path = list(sys.path)
+        self._old_modules = set(sys.modules)
+        sys.path.insert(0, self.firmware_dir)
+        sys.path.insert(0, FAKES_DIR)
+
+        self.clock.patch_time()
+
+        self._gc_patched = [(name, getattr(gc, name, None)) for name in ("mem_alloc", "mem_free")]
+        gc.mem_alloc = self.mem_alloc
+        gc.mem_free = self.mem_free
+
+        self._work_dir = tempfile.mkdtemp(prefix="featherwing-sim-")
+        self._old_cwd = os.getcwd()
+        os.chdir(self._work_dir)
+        return self
+
+    # Undo install(), and forget the firmware and fake modules imported since
+    def uninstall(self):
+        if state.simulator is not self:
+            return
+
+        os.chdir(self._old_cwd)
+        shutil.rmtree(self._work_dir, ignore_errors=True)
+
+        for name, fn in self._gc_patched:
+            if fn is None:
+                delattr(gc, name)
+            else:
+                setattr(gc, name, fn)
+
+        self.clock.unpatch_time()
+
+        sys.path[:] = self._old_path
+
+        for name in set(sys.modules) - self._old_modules:
+            path = getattr(sys.modules[name], "__file__", None) or ""
+
+            if path.startswith(self.firmware_dir) or path.startswith(FAKES_DIR):
+                del sys.modules[name]
+
+        state.simulator = None
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc_info):
+        self.uninstall()
+
+    # Import run.py, which sets everything up. Returns the module; call its update() to run a frame.
+    def boot(self):
+        if state.simulator is not self:
+            self.install()
+
+        with self.serial_output():
+            return importlib.import_module("run")
+
+    @property
+    def work_dir(self):
+        return self._work_dir
+
+    # Resolve a firmware relative path: the working directory first (SD card files), then the firmware directory
+    def firmware_path(self, path):
+        if os.path.exists(path):
+            return path
+
+        return os.path.join(self.firmware_dir, path)
+
+    ##############################
+    # Running
+    ##############################
+    # Call update_fn until 'duration' ms of simulated time have passed.
+    # Returns the number of calls.
+    def run_for(self, duration, update_fn=None):
+        if update_fn is None:
+            update_fn = sys.modules["run"].update
+
+        end = self.clock.monotonic_ns() + duration * 1_000_000
+        calls = 0
+
+        with self.serial_output():
+            while self.clock.monotonic_ns() < end:
+                before = self.clock.monotonic_ns()
+                update_fn()
+                calls += 1
+
+                # Don't spin forever if the update didn't let any time pass
+                if self.clock.monotonic_ns() == before:
+                    self.clock.advance_ms(1)
+
+        return calls
+
+    ##############################
+    # Keyboard
+    ##############################
+    def push_key_event(self, key_state, key):
+        if len(self.key_fifo) >= KEY_FIFO_SIZE:
+            self.dropped_key_events += 1
+            return
+
+        self.key_fifo.append((key_state, key))
+
+    def press(self, key):
+        self.push_key_event(STATE_PRESS, key)
+
+    def release(self, key):
+        self.push_key_event(STATE_RELEASE, key)
+
+    def tap(self, key):
+        self.press(key)
+        self.release(key)
+
+    # Tap each character in turn
+    def type_text(self, text):
+        for key in text:
+            self.tap(key)
+
+    ##############################
+    # Touch screen
+    ##############################
+    # Touch at display coordinates
+    def touch(self, x, y):
+        self.touch_raw = self._display_to_raw(x, y)
+        self.touched = True
+
+    # Touch at raw controller coordinates
+    def touch_at_raw(self, raw_x, raw_y):
+        self.touch_raw = (raw_x, raw_y)
+        self.touched = True
+
+    def release_touch(self):
+        self.touched = False
+
+    # (y, x, pressure), in the order the drivers' read_data() returns them
+    def read_touch_data(self):
+        raw_x, raw_y = self.touch_raw
+        return (raw_y, raw_x, TOUCH_PRESSURE if self.touched else 0)
+
+    # Invert the firmware's touch calibration, so touches can be given in display coordinates
+    def _display_to_raw(self, x, y):
+        if self._affine is None:
+            from touch_screen import configured_affine
+
+            width = self.display.width if self.display is not None else 320
+            height = self.display.height if self.display is not None else 240
+            self._affine = configured_affine(width, height)
+
+        a, b, c, d, e, f = self._affine
+        det = a * e - b * d
+        x -= c
+        y -= f
+        return (round((e * x - b * y) / det), round((a * y - d * x) / det))
+
+    ##############################
+    # HID
+    ##############################
+    def record_hid_report(self, device, report):
+        self.hid_report_counts[device] = self.hid_report_counts.get(device, 0) + 1
+
+        if self.keep_hid_reports:
+            self.hid_reports.append(HIDReport(self.clock.ticks_ms(), device, bytes(report)))
+
+    def clear_hid_reports(self):
+        self.hid_reports.clear()
+        self.hid_report_counts.clear()
+
+    ##############################
+    # Memory
+    ##############################
+    # CPython has no gc.mem_alloc()/mem_free(). Report the bytes traced by tracemalloc
+    # if it's running, so allocation deltas at least move in the right direction.
+    def mem_alloc(self):
+        import tracemalloc
+
+        if tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+
+        return 0
+
+    def mem_free(self):
+        return max(0, HEAP_SIZE - self.mem_alloc())
+
+    ##############################
+    # Serial output
+    ##############################
+    # Context manager for running firmware code, which drops its prints unless echo is set
+    def serial_output(self):
+        if self.echo:
+            return contextlib.nullcontext()
+
+        return contextlib.redirect_stdout(io.StringIO())
@@ -0,0 +1,8 @@
+# The simulator the fake modules talk to. Set by Simulator.install().
+simulator = None
+
+def current():
+    if simulator is None:
+        raise RuntimeError("No simulator installed; call Simulator.install() first")
+
+    return simulator
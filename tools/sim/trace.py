@@ -0,0 +1,152 @@
+import os
+import struct
+from collections import namedtuple
+
+##############################
+# Trace events
+##############################
+# Key event. a = key state (bbq10keyboard STATE_*), b = key
+EVENT_KEY = 0
+
+# Touch at display coordinates. a = x, b = y
+EVENT_TOUCH = 1
+
+# Touch at raw controller coordinates. a = raw x, b = raw y
+EVENT_TOUCH_RAW = 2
+
+# Finger lifted. a and b are unused
+EVENT_TOUCH_UP = 3
+
+# Mode the trace starts in
+MODE_REMOTE = "remote"
+MODE_PREFS = "prefs"
+
+TraceEvent = namedtuple("TraceEvent", ["time_ms", "kind", "a", "b"])
+
+##############################
+# Trace class
+##############################
+# A timestamped list of input events to play into the simulator.
+# Times are in ms from the start of the trace. Events are kept in time order,
+# and events at the same time stay in the order they were added.
+class Trace:
+    def __init__(self, name, start_mode=MODE_REMOTE):
+        self.name = name
+        self.start_mode = start_mode
+        self.events = []
+
+    @property
+    def duration(self):
+        return self.events[-1].time_ms if self.events else 0
+
+    def add(self, time_ms, kind, a=0, b=0):
+        events = self.events
+        index = len(events)
+
+        # Usually appended at the end, so search from there
+        while index > 0 and events[index - 1].time_ms > time_ms:
+            index -= 1
+
+        events.insert(index, TraceEvent(time_ms, kind, a, b))
+
+    def key(self, time_ms, key_state, key):
+        self.add(time_ms, EVENT_KEY, key_state, key)
+
+    def touch(self, time_ms, x, y):
+        self.add(time_ms, EVENT_TOUCH, x, y)
+
+    def touch_raw(self, time_ms, raw_x, raw_y):
+        self.add(time_ms, EVENT_TOUCH_RAW, raw_x, raw_y)
+
+    def touch_up(self, time_ms):
+        self.add(time_ms, EVENT_TOUCH_UP)
+
+##############################
+# TracePlayer class
+##############################
+# Feeds a trace's events into a simulator as the simulated clock reaches them
+class TracePlayer:
+    def __init__(self, trace, simulator):
+        self._trace = trace
+        self._simulator = simulator
+        self._index = 0
+        self._start_ms = simulator.clock.ticks_ms()
+
+    @property
+    def done(self):
+        return self._index >= len(self._trace.events)
+
+    # Apply every event that's due. Returns the number applied.
+    def update(self):
+        simulator = self._simulator
+        events = self._trace.events
+        elapsed = simulator.clock.ticks_ms() - self._start_ms
+        applied = 0
+
+        while self._index < len(events) and events[self._index].time_ms <= elapsed:
+            event = events[self._index]
+            self._index += 1
+            applied += 1
+
+            if event.kind == EVENT_KEY:
+                simulator.push_key_event(event.a, event.b)
+            elif event.kind == EVENT_TOUCH:
+                simulator.touch(event.a, event.b)
+            elif event.kind == EVENT_TOUCH_RAW:
+                simulator.touch_at_raw(event.a, event.b)
+            elif event.kind == EVENT_TOUCH_UP:
+                simulator.release_touch()
+
+        return applied
+
+##############################
+# Recorded traces
+##############################
+# Trace files written by CIRCUITPY/input_recorder.py. Keep these in step with it.
+RECORDING_MAGIC = b"FWTR"
+RECORDING_VERSION = 1
+RECORDING_HEADER_FORMAT = "<4sBBxx"
+RECORDING_RECORD_FORMAT = "<IBBhh"
+
+RECORD_KEY = 0
+RECORD_TOUCH_RAW = 1
+RECORD_TOUCH_FILTERED = 2
+RECORD_TOUCH_UP = 3
+
+RecordedSample = namedtuple("RecordedSample", ["time_ms", "record_type", "a", "x", "y"])
+
+# Every record in a recording, in order
+def read_recording(path):
+    with open(path, "rb") as f:
+        data = f.read()
+
+    header_size = struct.calcsize(RECORDING_HEADER_FORMAT)
+    magic, version, record_size = struct.unpack_from(RECORDING_HEADER_FORMAT, data, 0)
+
+    if magic != RECORDING_MAGIC:
+        raise ValueError(f"{path} is not an input recording")
+
+    if version != RECORDING_VERSION or record_size != struct.calcsize(RECORDING_RECORD_FORMAT):
+        raise ValueError(f"{path}: unsupported recording version {version}")
+
+    # A recording cut off mid-write can end with a partial record; ignore it
+    end = header_size + (len(data) - header_size) // record_size * record_size
+    return [RecordedSample(*fields) for fields in struct.iter_unpack(RECORDING_RECORD_FORMAT, data[header_size:end])]
+
+# Make a replayable trace from a recording. Key events and raw touch samples
+# are replayed; filtered positions are what the firmware made of them, so they're skipped.
+def load_recording(path, name=None, start_mode=MODE_REMOTE):
+    if name is None:
+        name = os.path.basename(path)
+
+    trace = Trace(name, start_mode)
+
+    for sample in read_recording(path):
+        if sample.record_type == RECORD_KEY:
+            trace.key(sample.time_ms, sample.a, chr(sample.x))
+        elif sample.record_type == RECORD_TOUCH_RAW:
+            trace.touch_raw(sample.time_ms, sample.x, sample.y)
+        elif sample.record_type == RECORD_TOUCH_UP:
+            trace.touch_up(sample.time_ms)
+
+    return trace
@@ -0,0 +1,110 @@
+import math
+from sim.simulator import STATE_PRESS, STATE_RELEASE
+from sim.trace import Trace, MODE_REMOTE, MODE_PREFS
+
+# The firmware's function_key module is imported when a trace is made,
+# so these need the simulator installed first.
+
+# Display coordinates inside the remote mode title label, which opens preferences when held
+TITLE_TOUCH_POINT = (20, 12)
+
+# How long to hold the title to open preferences (ms). Longer than remote_mode.CONFIG_HOLD_DURATION.
+TITLE_HOLD_DURATION = 1600
+
+def _tap(trace, time_ms, key, hold=30):
+    trace.key(time_ms, STATE_PRESS, key)
+    trace.key(time_ms + hold, STATE_RELEASE, key)
+
+##############################
+# Synthetic traces
+##############################
+# Bursts of fast typing, with pauses in between
+def typing_bursts(burst_count=8, text="the quick brown fox jumps over the lazy dog. ", key_interval=25):
+    trace = Trace("typing_bursts")
+    time_ms = 100
+
+    for _ in range(burst_count):
+        # Overlapping key presses, like a fast typist rolling from one key to the next
+        for key in text:
+            trace.key(time_ms, STATE_PRESS, key)
+            trace.key(time_ms + key_interval + 10, STATE_RELEASE, key)
+            time_ms += key_interval
+
+        time_ms += 500
+
+    return trace
+
+# Long mouse drags: straight lines, then circles
+def mouse_drags(drag_count=6, drag_duration=2000, sample_interval=5):
+    trace = Trace("mouse_drags")
+    time_ms = 100
+    steps = drag_duration // sample_interval
+
+    for drag in range(drag_count):
+        for step in range(steps + 1):
+            t = step / steps
+
+            if drag % 2 == 0:
+                x = 20 + t * 280
+                y = 40 + t * 160
+            else:
+                angle = t * 4 * math.pi
+                x = 160 + math.cos(angle) * 90
+                y = 120 + math.sin(angle) * 80
+
+            trace.touch(time_ms, round(x), round(y))
+            time_ms += sample_interval
+
+        trace.touch_up(time_ms)
+        time_ms += 300
+
+    return trace
+
+# Hammering the D-pad as fast as possible, including presses that land in the same frame
+def dpad_hammering(tap_count=400, tap_interval=12, start_mode=MODE_REMOTE):
+    import function_key
+
+    trace = Trace("dpad_hammering" if start_mode == MODE_REMOTE else "prefs_dpad_hammering", start_mode)
+    keys = (function_key.UP, function_key.RIGHT, function_key.DOWN, function_key.LEFT)
+    time_ms = 100
+
+    for tap in range(tap_count):
+        _tap(trace, time_ms, keys[tap % len(keys)], hold=tap_interval // 2)
+        time_ms += tap_interval
+
+    return trace
+
+# Open preferences by holding the title, change the color, then pick each activity in turn
+def activity_switches(switch_count=8):
+    import function_key
+
+    trace = Trace("activity_switches")
+    select_keys = (function_key.L1, function_key.L2, function_key.R1, function_key.R2)
+    time_ms = 100
+
+    for switch in range(switch_count):
+        trace.touch(time_ms, *TITLE_TOUCH_POINT)
+        time_ms += TITLE_HOLD_DURATION
+        trace.touch_up(time_ms)
+        time_ms += 200
+
+        _tap(trace, time_ms, function_key.RIGHT)
+        time_ms += 200
+
+        _tap(trace, time_ms, select_keys[switch % len(select_keys)])
+        time_ms += 300
+
+        # Use the new activity for a bit
+        _tap(trace, time_ms, function_key.SELECT)
+        time_ms += 200
+
+    return trace
+
+# Name -> function making the trace
+SYNTHETIC = {
+    "typing_bursts": typing_bursts,
+    "mouse_drags": mouse_drags,
+    "dpad_hammering": dpad_hammering,
+    "prefs_dpad_hammering": lambda: dpad_hammering(start_mode=MODE_PREFS),
+    "activity_switches": activity_switches,
+}
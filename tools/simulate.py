@@ -0,0 +1,73 @@
+############################################################
+# Run the firmware on the host, under the hardware simulator
+#
+# Boots CIRCUITPY/run.py unmodified with fake hardware and
+# a virtual clock, optionally plays a short scripted demo
+# (key taps and a touch drag), then prints the HID reports
+# the firmware sent.
+#
+#     python3 tools/simulate.py --seconds 5 --demo
+############################################################
+import os
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sim import Simulator
+from sim.simulator import TOUCH_TSC2004, TOUCH_STMPE610
+
+def run_demo(simulator):
+    import function_key
+
+    # Tap every function key in turn
+    for key in function_key.ALL:
+        simulator.tap(key)
+        simulator.run_for(50)
+
+    # Type a few characters
+    simulator.type_text("hi!")
+    simulator.run_for(50)
+
+    # Drag across the touch screen
+    for step in range(20):
+        simulator.touch(100 + step * 5, 120 + step * 2)
+        simulator.run_for(10)
+
+    simulator.release_touch()
+    simulator.run_for(50)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the firmware under the hardware simulator")
+    parser.add_argument("--seconds", type=float, default=2.0, help="simulated seconds to run for")
+    parser.add_argument("--demo", action="store_true", help="play scripted key presses and a touch drag")
+    parser.add_argument("--disconnected", action="store_true", help="start with no BLE connection")
+    parser.add_argument("--sd-card", action="store_true", help="simulate an inserted SD card")
+    parser.add_argument("--touch", choices=(TOUCH_TSC2004, TOUCH_STMPE610), default=TOUCH_TSC2004, help="touch controller")
+    parser.add_argument("--quiet", action="store_true", help="hide the firmware's serial output")
+    args = parser.parse_args()
+
+    simulator = Simulator(
+        connected=not args.disconnected,
+        sd_card=args.sd_card,
+        touch_controller=args.touch,
+        echo=not args.quiet
+    )
+
+    with simulator:
+        simulator.boot()
+        simulator.clear_hid_reports()
+
+        if args.demo:
+            run_demo(simulator)
+
+        simulator.run_for(int(args.seconds * 1000))
+
+        print(f"Simulated {simulator.clock.ticks_ms()} ms")
+        print(f"{len(simulator.hid_reports)} HID reports sent")
+
+        for report in simulator.hid_reports:
+            print(f"{report.time_ms:>8} ms {report.device:<16} {report.report.hex(' ')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+############################################################
+# Scheduler tests
+#
+# Runs CIRCUITPY/scheduler.py against the simulator's
+# virtual clock, so frame timings are exact:
+#
+#     python3 -m pytest tools/test_scheduler.py
+#
+# or without pytest:
+#
+#     python3 tools/test_scheduler.py
+############################################################
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sim import Simulator
+
+# Run 'frame_count' scheduler frames in which the input task takes 'input_duration' ms.
+# Returns how many times a housekeeping task due every frame ran.
+def _run_frames(frame_count, input_duration):
+    simulator = Simulator(echo=False)
+
+    with simulator:
+        from scheduler import Scheduler, DEFAULT_MAX_SKIPPED_FRAMES, PRIORITY_INPUT, PRIORITY_HOUSEKEEPING
+
+        clock = simulator.clock
+        scheduler = Scheduler(sleep_fn=clock.advance_ms)
+        runs = [0]
+
+        def slow_input():
+            clock.advance_ms(input_duration)
+
+        def housekeeping():
+            runs[0] += 1
+
+        scheduler.add(slow_input, period=1, priority=PRIORITY_INPUT)
+        scheduler.add(housekeeping, period=1, priority=PRIORITY_HOUSEKEEPING)
+
+        for _ in range(frame_count):
+            scheduler.update()
+
+        return (runs[0], DEFAULT_MAX_SKIPPED_FRAMES)
+
+def test_tasks_run_every_frame_within_budget():
+    runs, _ = _run_frames(frame_count=20, input_duration=2)
+    assert runs == 20
+
+def test_overdue_tasks_run_when_input_uses_the_whole_frame():
+    frame_count = 50
+    runs, max_skipped_frames = _run_frames(frame_count=frame_count, input_duration=12)
+
+    # Skipped for at most max_skipped_frames frames, then run
+    assert runs == frame_count // (max_skipped_frames + 1)
+
+if __name__ == "__main__":
+    test_tasks_run_every_frame_within_budget()
+    test_overdue_tasks_run_when_input_uses_the_whole_frame()
+    print("OK")